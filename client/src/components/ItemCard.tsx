@@ -1,5 +1,5 @@
 import { Link } from "react-router-dom"
-import { formatBytes, formatDate } from "@/lib/utils"
+import { formatBytes, formatDate, formatDuration } from "@/lib/utils"
 import { TagBadge } from "./TagBadge"
 import type { Item } from "@/lib/types"
 import { FileText, Key, Image, Video, File, ArrowRight, Pin, PinOff } from "lucide-react"
@@ -61,6 +61,39 @@ export function ItemCard({ item, onTogglePin }: ItemCardProps) {
             </div>
           </div>
 
+          {item.thumbnail && (
+            <div className="relative mt-2">
+              <img
+                src={`${item.thumbnail.url}?w=512`}
+                alt={item.title || item.file_name || ""}
+                width={item.thumbnail.width ?? undefined}
+                height={item.thumbnail.height ?? undefined}
+                loading="lazy"
+                decoding="async"
+                className="h-auto max-h-48 w-full rounded-lg object-cover"
+              />
+              {item.video?.duration != null && (
+                <span className="absolute bottom-1.5 right-1.5 rounded bg-black/70 px-1.5 py-0.5 text-xs text-white">
+                  {formatDuration(item.video.duration)}
+                </span>
+              )}
+            </div>
+          )}
+
+          {item.snippet && (
+            <p className="mt-2 line-clamp-3 text-xs text-gray-600 dark:text-gray-400">
+              {item.snippet.map((part, index) =>
+                index % 2 ? (
+                  <mark key={index} className="rounded bg-yellow-200 px-0.5 text-black dark:bg-yellow-500/40 dark:text-white">
+                    {part}
+                  </mark>
+                ) : (
+                  part
+                )
+              )}
+            </p>
+          )}
+
           <div className="mt-2 flex items-center justify-between">
             <span className="text-xs text-gray-500">
               {formatDate(item.created_at)}
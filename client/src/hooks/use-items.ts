@@ -24,6 +24,8 @@ export function useItems(
   if (searchQuery) params.set("q", searchQuery)
   params.set("page", String(page))
   params.set("page_size", "20")
+  // Cards only need a preview; the detail page loads the full note
+  params.set("snippet_length", "2000")
 
   const query = useQuery({
     queryKey: [...ITEMS_QUERY_KEY, tagIds, itemType, searchQuery, page],
@@ -21,12 +21,26 @@ export interface Item {
   type: ItemType
   title: string | null
   content?: string | Record<string, string>
+  content_truncated?: boolean
+  // Search results only: alternating plain and matched text, matches at odd indexes
+  snippet?: string[]
   file?: {
     name: string
     size: number
     mimetype: string
     url: string
   }
+  // Image items, and video items once processed: a scaled-down copy or
+  // poster frame, and the original's pixel size when known
+  thumbnail?: {
+    url: string
+    width: number | null
+    height: number | null
+  } | null
+  video?: {
+    duration: number | null  // in seconds
+    codec: string
+  } | null
   file_name?: string
   file_size?: number
   file_mimetype?: string
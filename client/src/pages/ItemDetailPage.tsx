@@ -216,6 +216,8 @@ export function ItemDetailPage() {
             {item.type === "video" && (
               <video
                 src={item.file.url}
+                poster={item.thumbnail?.url}
+                preload={item.thumbnail ? "none" : "metadata"}
                 controls
                 className="max-h-[600px] rounded-lg"
               />
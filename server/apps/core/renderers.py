@@ -0,0 +1,62 @@
+"""
+Response renderers.
+
+``ORJSONRenderer`` replaces DRF's stdlib-json ``JSONRenderer``. orjson
+encodes UUIDs and datetimes natively, so views can return them as they
+come from the database. The output matches ``str()`` and ``isoformat()``.
+
+``MessagePackRenderer`` is offered to clients that send
+``Accept: application/msgpack``. It is enabled in settings only when the
+optional ``msgpack`` package is installed.
+"""
+import datetime
+import uuid
+from typing import Any
+
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Anything orjson cannot encode (lazy translations, Decimals, ...) is
+# converted the way DRF's JSONRenderer would
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj: Any) -> Any:
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:
+        if data is None:
+            return b""
+        option = orjson.OPT_NON_STR_KEYS
+        if accepted_media_type and "indent=" in accepted_media_type:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    return _drf_encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:
+        import msgpack
+
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
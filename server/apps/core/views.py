@@ -20,12 +20,33 @@ import boto3
 from botocore.exceptions import ClientError
 
 from .models import BackupSettings, BackupLog
-from apps.items.models import Item, Tag, ItemTag
+from apps.items import blobs, counters, suggestions, sync, versions, videos
+from apps.items.models import Blob, Item, Tag, ItemTag
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+def write_user_media(zipf: zipfile.ZipFile, user) -> int:
+    """Add the files of ``user``'s items to ``zipf`` under ``media/``.
+
+    Files shared by several items through the blob store are written once.
+    Returns the number of files written.
+    """
+    media_root = settings.MEDIA_ROOT
+    file_paths = (
+        Item.objects.filter(user=user).exclude(file_path="")
+        .order_by().values_list("file_path", flat=True).distinct()
+    )
+    files_count = 0
+    for file_path in file_paths:
+        full_path = os.path.join(media_root, file_path)
+        if os.path.exists(full_path):
+            zipf.write(full_path, os.path.join("media", os.path.relpath(full_path, media_root)))
+            files_count += 1
+    return files_count
+
+
 class HealthCheckView(APIView):
     """
     Health check endpoint - no authentication required.
@@ -179,7 +200,6 @@ class ManualBackupView(APIView):
             )
 
     def _perform_backup(self, user, settings_obj):
-        from apps.items.models import Item
         from django.contrib.auth import get_user_model
 
         User = get_user_model()
@@ -187,11 +207,11 @@ class ManualBackupView(APIView):
         # Determine if this is a full (admin) backup or single-user backup
         is_full_backup = user.is_staff or user.is_superuser
 
-        # Check if backup is needed
+        # Check if backup is needed (totals come from the per-user counters table)
         if is_full_backup:
-            item_count = Item.objects.count()
+            item_count = counters.get_global_total()
         else:
-            item_count = Item.objects.filter(user=user).count()
+            item_count = counters.get_count(user.id)
 
         if settings_obj.backup_on_new_item and item_count <= settings_obj.last_item_count:
             BackupLog.objects.create(
@@ -253,14 +273,7 @@ class ManualBackupView(APIView):
                                 files_count += 1
                 else:
                     # Regular user backup: only backup own files
-                    user_media_dir = os.path.join(media_root, str(user.id))
-                    if os.path.exists(user_media_dir):
-                        for root, dirs, files in os.walk(user_media_dir):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                arcname = os.path.join("media", str(user.id), os.path.relpath(file_path, user_media_dir))
-                                zipf.write(file_path, arcname)
-                                files_count += 1
+                    files_count = write_user_media(zipf, user)
 
             # Perform backups
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -442,6 +455,7 @@ class ExportDataView(APIView):
                         "file_name": item.file_name or "",
                         "file_size": item.file_size or 0,
                         "file_mimetype": item.file_mimetype or "",
+                        "file_sha256": item.file_sha256,
                         "created_at": item.created_at.isoformat(),
                         "updated_at": item.updated_at.isoformat(),
                         "tags": item_tags,
@@ -463,15 +477,7 @@ class ExportDataView(APIView):
                 zipf.writestr("tags.json", json.dumps(tags_data, indent=2))
 
                 # Export user's media files
-                media_root = settings.MEDIA_ROOT
-                user_media_dir = os.path.join(media_root, str(user.id))
-
-                if os.path.exists(user_media_dir):
-                    for root, dirs, files in os.walk(user_media_dir):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            arcname = os.path.join("media", os.path.relpath(file_path, media_root))
-                            zipf.write(file_path, arcname)
+                write_user_media(zipf, user)
 
                 # Export user metadata
                 user_metadata = {
@@ -633,6 +639,7 @@ class ImportDataView(APIView):
                 # Read and import items
                 items_json = zipf.read("items.json").decode("utf-8")
                 items_data = json.loads(items_json)
+                imported_ids = []
 
                 for item_data in items_data:
                     try:
@@ -652,27 +659,33 @@ class ImportDataView(APIView):
 
                         # Handle file if present
                         if item_data.get("file_name") and new_item.file_name:
-                            # Find the file in the ZIP - could be in a subfolder
-                            # Export structure: media/{user_id}/subfolder/filename
-                            # We need to find any path that ends with the filename
-                            filename = item_data["file_name"]
-                            matching_path = None
-                            for path in file_list:
-                                if path.startswith(f"media/") and path.endswith(filename):
-                                    matching_path = path
-                                    break
+                            # Newer exports store files in the blob store: media/blobs/../{sha256}
+                            blob_path = f"media/{Blob.path_for(item_data['file_sha256'])}" if item_data.get("file_sha256") else None
+                            if blob_path in file_list:
+                                matching_path = blob_path
+                            else:
+                                # Older exports: media/{user_id}/subfolder/filename
+                                # We need to find any path that ends with the filename
+                                filename = item_data["file_name"]
+                                matching_path = None
+                                for path in file_list:
+                                    if path.startswith(f"media/") and path.endswith(filename):
+                                        matching_path = path
+                                        break
 
                             if matching_path:
-                                # Extract file to media directory
-                                user_media_dir = os.path.join(settings.MEDIA_ROOT, str(user.id))
-                                os.makedirs(user_media_dir, exist_ok=True)
-
-                                file_path = os.path.join(user_media_dir, filename)
-                                with open(file_path, "wb") as f:
-                                    f.write(zipf.read(matching_path))
-
-                                new_item.file_path = file_path
+                                # Stored once however many items or imports share the content
+                                with zipf.open(matching_path) as member:
+                                    temp_path, sha256, size = blobs.write_temp(
+                                        iter(lambda: member.read(blobs.COPY_BUFFER_SIZE), b"")
+                                    )
+
+                                new_item.file_path = Blob.path_for(sha256)
+                                new_item.file_sha256 = sha256
+                                new_item.file_size = size
                                 new_item.save()
+                                blobs.store(temp_path, sha256, size)
+                                videos.enqueue(Item.objects.filter(pk=new_item.pk))
                                 import_summary["files_imported"] += 1
 
                         # Import tags
@@ -688,10 +701,15 @@ class ImportDataView(APIView):
                                         pass  # Skip if tag doesn't exist
 
                         import_summary["items_imported"] += 1
+                        imported_ids.append(new_item.id)
 
                     except Exception as e:
                         import_summary["errors"].append(f"Failed to import item {item_data.get('id', 'unknown')}: {str(e)}")
 
+                counters.rebuild(user.id)
+                suggestions.rebuild(user.id)
+                sync.record_changed(user.id, Item.objects.filter(id__in=imported_ids))
+
             return Response({
                 "data": {
                     "message": "Data imported successfully",
@@ -864,6 +882,9 @@ class ImportDataView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            # The restored data predates every ETag and cached page handed out
+            versions.reset_all()
+
             # Count restored items
             items_count = Item.objects.count()
             tags_count = Tag.objects.count()
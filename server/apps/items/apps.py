@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ItemsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.items"
+
+    def ready(self):
+        from django.db.models import CharField
+        from .lookups import TrigramContains
+
+        CharField.register_lookup(TrigramContains)
@@ -0,0 +1,106 @@
+"""
+Batch operations over a selection of items.
+
+Each operation runs a fixed number of statements however many items are
+selected. Tags are added with one bulk insert and removed with one
+DELETE. Pinning and type changes are one UPDATE each. Counters are
+adjusted from the rows each statement touches. At the end, every item
+that changed is stamped for delta sync with a single UPDATE.
+
+Operations run in the order of ``OPERATIONS``. Type changes only move
+items between the file types, since text and login content are stored in
+different formats; a selection that includes other items is rejected
+before anything runs (see ``incompatible_with_type``).
+"""
+import uuid
+from collections.abc import Iterable
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import counters, sync
+from .models import Item, ItemTag, ItemType
+
+OPERATIONS = ("add_tags", "remove_tags", "set_pinned", "set_type")
+FILE_TYPES = (ItemType.IMAGE, ItemType.VIDEO, ItemType.FILE)
+
+
+def owned_items(user, item_ids: Iterable) -> QuerySet:
+    """Return the items among ``item_ids`` that belong to ``user``, skipping malformed ids."""
+    parsed = set()
+    for item_id in item_ids:
+        try:
+            parsed.add(uuid.UUID(str(item_id)))
+        except ValueError:
+            continue
+    return Item.objects.filter(user=user, id__in=parsed)
+
+
+def add_tags(user, items: QuerySet, tag_ids: set) -> tuple[set, int]:
+    """Tag ``items`` with ``tag_ids``; return ``(changed item ids, rows added)``."""
+    sizes = dict(items.values_list("id", "file_size"))
+    existing = set(
+        ItemTag.objects.filter(item_id__in=items.values("id"), tag_id__in=tag_ids).values_list("item_id", "tag_id")
+    )
+    links = [(item_id, tag_id) for item_id in sizes for tag_id in tag_ids if (item_id, tag_id) not in existing]
+    ItemTag.objects.bulk_create([ItemTag(item_id=item_id, tag_id=tag_id) for item_id, tag_id in links])
+    counters.record_tag_links(user.id, [(tag_id, sizes[item_id]) for item_id, tag_id in links])
+    return {item_id for item_id, _ in links}, len(links)
+
+
+def remove_tags(user, items: QuerySet, tag_ids: set) -> tuple[set, int]:
+    """Untag ``items``; return ``(changed item ids, rows removed)``."""
+    links = ItemTag.objects.filter(item_id__in=items.values("id"), tag_id__in=tag_ids)
+    rows = list(links.values_list("item_id", "tag_id", "item__file_size"))
+    counters.record_tag_links(user.id, [(tag_id, size) for _, tag_id, size in rows], sign=-1)
+    links.delete()
+    return {item_id for item_id, _, _ in rows}, len(rows)
+
+
+def set_pinned(user, items: QuerySet, is_pinned: bool) -> tuple[set, int]:
+    changed = items.exclude(is_pinned=is_pinned)
+    changed_ids = set(changed.values_list("id", flat=True))
+    return changed_ids, changed.update(is_pinned=is_pinned)
+
+
+def incompatible_with_type(items: QuerySet) -> list[str]:
+    """Return the ids among ``items`` that ``set_type`` cannot retype."""
+    return sorted(str(item_id) for item_id in items.exclude(type__in=FILE_TYPES).values_list("id", flat=True))
+
+
+def set_type(user, items: QuerySet, item_type: str) -> tuple[set, int]:
+    changed = items.filter(type__in=FILE_TYPES).exclude(type=item_type)
+    changed_ids = set(changed.values_list("id", flat=True))
+    counters.record_type_changed(user.id, changed, item_type)
+    return changed_ids, changed.update(type=item_type)
+
+
+_HANDLERS = {
+    "add_tags": add_tags,
+    "remove_tags": remove_tags,
+    "set_pinned": set_pinned,
+    "set_type": set_type,
+}
+
+
+def apply(user, items: QuerySet, operations: dict) -> tuple[int, dict]:
+    """Run ``{operation: argument}`` over ``items``.
+
+    Returns the number of items changed by any operation and the number of
+    rows each operation affected.
+    """
+    changed_ids = set()
+    affected = {}
+    with transaction.atomic():
+        for operation in OPERATIONS:
+            if operation not in operations:
+                continue
+            ids, affected[operation] = _HANDLERS[operation](user, items, operations[operation])
+            changed_ids |= ids
+
+        if changed_ids:
+            changed = Item.objects.filter(id__in=changed_ids)
+            changed.update(updated_at=timezone.now())
+            sync.record_changed(user.id, changed)
+    return len(changed_ids), affected
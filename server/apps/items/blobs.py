@@ -0,0 +1,239 @@
+"""
+Content-addressed storage for uploaded files.
+
+Each distinct file is stored once, at ``MEDIA_ROOT/blobs/<aa>/<bb>/<sha256>``,
+and described by a ``Blob`` row. Items point at it through ``file_sha256``;
+their ``file_path`` is the blob's path, so serving and exports read it like
+any other file. ``Blob.ref_count`` is the number of items using the blob and
+is kept in the transaction that creates or deletes them:
+
+* ``store`` after an item is created from a newly uploaded file
+* ``add_reference`` when an item is created from content already stored
+* ``release`` before items are deleted
+
+Files move only once the database agrees. ``store`` moves a new file
+into place after its transaction commits, so a rollback never leaves a
+blob file without a row. A blob whose count drops to zero stays on disk
+until ``collect``, run by ``manage.py reclaim_files``, deletes the row and
+then the file. Both sides touch the row first: an upload that increments
+the count first keeps the blob alive, and one that finds the row gone
+creates it again. Moving a file in and deleting one take a lock on the
+blob's directory, and deletion skips a file whose row was created again
+meanwhile. A crash between the database and the filesystem leaves either
+an orphaned file, which is reused when the same content comes back, or a
+row whose file is missing. Hash-first uploads will not use such a row,
+and the next upload of the content puts the file in place.
+
+Files stored before blobs existed have no ``file_sha256`` and are moved in
+by ``manage.py store_files_as_blobs``; until then they are deleted through
+the reclaim queue as before.
+
+Every user deduplicated onto a blob reads the same file, so only private
+files become blobs: files no request can still write to, hashed after
+the last write.
+
+Hash-first uploads only reuse blobs the user already owns an item for.
+Knowing another user's file hash must not be enough to read the file.
+"""
+import fcntl
+import functools
+import hashlib
+import os
+import uuid
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, QuerySet, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from . import previews
+from .models import Blob, Item
+
+# Bytes read from a stream or file at a time
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _full_path(relative_path: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while data := f.read(COPY_BUFFER_SIZE):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def write_temp(chunks: Iterable[bytes]) -> tuple[str, str, int]:
+    """Write ``chunks`` to a temporary file under MEDIA_ROOT, hashing on the way.
+
+    Returns ``(temp path, sha256, size)``; the path is relative to MEDIA_ROOT
+    and on the same filesystem as the blobs, so ``store`` can rename it.
+    """
+    os.makedirs(_full_path("uploads"), exist_ok=True)
+    temp_path = f"uploads/{uuid.uuid4()}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(_full_path(temp_path), "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(_full_path(temp_path))
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def owned_blob(user, sha256: str) -> Blob | None:
+    """Return the blob with this hash if one of ``user``'s items already uses it."""
+    if not Item.objects.filter(user=user, file_sha256=sha256).exists():
+        return None
+    blob = Blob.objects.filter(sha256=sha256, ref_count__gt=0).first()
+    # A blob whose file never made it to disk is repaired by uploading the file
+    return blob if blob and os.path.exists(_full_path(Blob.path_for(sha256))) else None
+
+
+def add_reference(sha256: str) -> bool:
+    """Count one more item using the blob; False if it no longer exists."""
+    return Blob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1) == 1
+
+
+def store(temp_path: str, sha256: str, size: int) -> str:
+    """Count one more item using ``temp_path``'s content and consume the file.
+
+    The file must be private to the caller, such as one made by
+    ``write_temp``: nothing may still be able to write to it. Once the
+    transaction commits, it becomes the blob's file if that is missing and
+    is deleted otherwise; after a rollback it is left for the caller.
+
+    Call last in the transaction that creates the item. Returns the blob's
+    path relative to MEDIA_ROOT.
+    """
+    while not add_reference(sha256):
+        try:
+            with transaction.atomic():
+                Blob.objects.create(sha256=sha256, size=size, ref_count=1)
+        except IntegrityError:
+            # Created by a concurrent upload of the same content
+            continue
+        break
+    transaction.on_commit(functools.partial(_move_into_place, temp_path, sha256), robust=True)
+    return Blob.path_for(sha256)
+
+
+@contextmanager
+def _file_lock(sha256: str) -> Iterator[None]:
+    """Serialize moving a blob's file into place with deleting it."""
+    directory = os.path.dirname(_full_path(Blob.path_for(sha256)))
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _move_into_place(temp_path: str, sha256: str) -> None:
+    path = Blob.path_for(sha256)
+    with _file_lock(sha256):
+        if os.path.exists(_full_path(path)):
+            # Same content, already stored
+            os.remove(_full_path(temp_path))
+        else:
+            os.replace(_full_path(temp_path), _full_path(path))
+
+
+def release(items: QuerySet) -> tuple[int, int]:
+    """Drop the references ``items`` hold; call before deleting them.
+
+    Returns ``(files, bytes)`` of blobs left unused, which ``collect`` will
+    delete.
+    """
+    counts = dict(
+        items.exclude(file_sha256="").order_by()
+        .values("file_sha256").annotate(n=Count("id"))
+        .values_list("file_sha256", "n")
+    )
+    if not counts:
+        return 0, 0
+
+    Blob.objects.filter(sha256__in=counts).update(
+        ref_count=F("ref_count") - Case(*(When(sha256=sha256, then=Value(n)) for sha256, n in counts.items()))
+    )
+    unused = Blob.objects.filter(sha256__in=counts, ref_count=0).aggregate(
+        files=Count("sha256"), bytes=Coalesce(Sum("size"), 0)
+    )
+    return unused["files"], unused["bytes"]
+
+
+def collect(batch_size: int = 500) -> tuple[int, int, int]:
+    """Delete one batch of unused blobs, their files and their derivatives.
+
+    Returns ``(files deleted, bytes deleted, failures)``. Files are removed
+    only after their row is deleted for good, so a crash or failure leaves
+    an orphaned file rather than a row without one. A file that cannot be
+    removed is counted as a failure and left behind.
+    """
+    done = size = failed = 0
+    candidates = list(Blob.objects.filter(ref_count=0).values_list("sha256", flat=True)[:batch_size])
+    for sha256 in candidates:
+        with transaction.atomic():
+            # Re-checked under the row lock, in case an upload reused it
+            blob = Blob.objects.select_for_update(skip_locked=True).filter(sha256=sha256, ref_count=0).first()
+            if blob is None:
+                continue
+            Blob.objects.filter(sha256=sha256).delete()
+            derivatives = previews.release([sha256])
+
+        try:
+            with _file_lock(sha256):
+                # Stored again since the delete committed: the file is the new blob's
+                if not Blob.objects.filter(sha256=sha256).exists():
+                    _remove(Blob.path_for(sha256))
+            for path, _ in derivatives:
+                _remove(path)
+        except OSError:
+            failed += 1
+            continue
+        done += 1
+        size += blob.size
+    return done, size, failed
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(_full_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def adopt(item: Item) -> bool:
+    """Move a file stored before blobs into the blob store.
+
+    Returns False if the file is missing or the item changed meanwhile.
+    """
+    if not os.path.exists(_full_path(item.file_path)):
+        return False
+    sha256 = file_sha256(_full_path(item.file_path))
+    size = os.path.getsize(_full_path(item.file_path))
+    with transaction.atomic():
+        adopted = Item.objects.filter(pk=item.pk, file_sha256="", file_path=item.file_path).update(
+            file_path=Blob.path_for(sha256), file_sha256=sha256
+        )
+        if adopted:
+            store(item.file_path, sha256, size)
+    return bool(adopted)
+
+
+def unused() -> dict:
+    """Totals for blobs waiting to be collected."""
+    return Blob.objects.filter(ref_count=0).aggregate(
+        files=Count("sha256"),
+        bytes=Coalesce(Sum("size"), 0),
+    )
@@ -0,0 +1,130 @@
+"""
+Bulk item creation for ingestion scripts.
+
+``validate`` checks every row up front and resolves all tag ids with one
+query. ``create`` then inserts the items and their tags with two
+``bulk_create`` calls in a single transaction. The new rows share one
+``change_seq`` (see ``sync.next_change_seq``), so counters, suggestions
+and sync find them again with one indexed filter instead of a list of ids.
+
+Only text and login items can be created this way; files go through the
+upload endpoint.
+"""
+import json
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from . import counters, suggestions, sync
+from .models import Item, ItemTag, ItemType, Tag
+
+BULK_TYPES = (ItemType.TEXT, ItemType.LOGIN)
+MAX_TITLE_LENGTH = Item._meta.get_field("title").max_length
+
+
+def _error(index: int, code: str, message: str) -> dict:
+    return {"index": index, "code": code, "message": message}
+
+
+def _parse_tag_ids(value) -> list[uuid.UUID]:
+    """Parse a list of tag ids; raises ValueError naming the first invalid one."""
+    if not isinstance(value, list):
+        raise ValueError("tag_ids must be a list of tag ids")
+    parsed = []
+    for tag_id in value:
+        try:
+            if not isinstance(tag_id, str):
+                raise ValueError
+            parsed.append(uuid.UUID(tag_id))
+        except ValueError:
+            raise ValueError(f"Invalid tag id: {json.dumps(tag_id)}") from None
+    # Repeated ids are kept once, in their first position
+    return list(dict.fromkeys(parsed))
+
+
+def _clean(index: int, row) -> tuple[dict | None, dict | None]:
+    """Return ``(cleaned row, None)`` or ``(None, error)`` for one input row."""
+    if not isinstance(row, dict):
+        return None, _error(index, "INVALID_ITEM", "Each item must be an object")
+
+    item_type = row.get("type")
+    if item_type not in BULK_TYPES:
+        return None, _error(index, "INVALID_TYPE", f"Invalid item type. Must be one of: {', '.join(BULK_TYPES)}")
+
+    title = row.get("title")
+    if title is not None and not isinstance(title, str):
+        return None, _error(index, "INVALID_TITLE", "Title must be a string")
+    title = (title or "").strip() or None
+    if title and len(title) > MAX_TITLE_LENGTH:
+        return None, _error(index, "INVALID_TITLE", f"Title exceeds {MAX_TITLE_LENGTH} characters")
+
+    content = row.get("content")
+    if content is None:
+        content = ""
+    if item_type == ItemType.LOGIN and content != "":
+        # Login content is stored as a JSON object and parsed on every read
+        if isinstance(content, str):
+            try:
+                content = json.loads(content)
+            except ValueError:
+                content = None
+        if not isinstance(content, dict):
+            return None, _error(index, "INVALID_CONTENT", "Login content must be a JSON object")
+        content = json.dumps(content)
+    elif not isinstance(content, str):
+        return None, _error(index, "INVALID_CONTENT", "Text content must be a string")
+    if len(content.encode("utf-8")) > settings.MAX_TEXT_SIZE:
+        return None, _error(index, "CONTENT_TOO_LARGE", f"Text content exceeds {settings.MAX_TEXT_SIZE} bytes")
+
+    try:
+        tag_ids = _parse_tag_ids(row.get("tag_ids", []))
+    except ValueError as e:
+        return None, _error(index, "INVALID_TAG", str(e))
+
+    return {"type": item_type, "title": title, "content": content, "tag_ids": tag_ids}, None
+
+
+def validate(user, rows: list) -> tuple[list[dict], list[dict]]:
+    """Check ``rows`` and return ``(cleaned rows, errors)``.
+
+    Each error names the index of the offending row. Tags must exist and
+    belong to ``user``.
+    """
+    cleaned, errors = [], []
+    for index, row in enumerate(rows):
+        data, error = _clean(index, row)
+        if error:
+            errors.append(error)
+        else:
+            cleaned.append((index, data))
+
+    requested = {tag_id for _, data in cleaned for tag_id in data["tag_ids"]}
+    owned = set(Tag.objects.filter(user=user, id__in=requested).values_list("id", flat=True)) if requested else set()
+    for index, data in cleaned:
+        unknown = [str(tag_id) for tag_id in data["tag_ids"] if tag_id not in owned]
+        if unknown:
+            errors.append(_error(index, "INVALID_TAG", f"Tags not found: {', '.join(unknown)}"))
+
+    errors.sort(key=lambda error: error["index"])
+    return [data for _, data in cleaned], errors
+
+
+def create(user, rows: list[dict]) -> list[Item]:
+    """Insert rows returned by ``validate`` and return the new items in input order."""
+    with transaction.atomic():
+        seq = sync.next_change_seq(user.id)
+        items = Item.objects.bulk_create([
+            Item(user=user, type=row["type"], title=row["title"], content=row["content"], change_seq=seq)
+            for row in rows
+        ])
+        ItemTag.objects.bulk_create([
+            ItemTag(item=item, tag_id=tag_id)
+            for item, row in zip(items, rows)
+            for tag_id in row["tag_ids"]
+        ])
+
+        created = Item.objects.filter(user=user, change_seq=seq)
+        counters.record_added(user.id, created)
+        suggestions.record_items_added(user.id, created)
+    return items
@@ -0,0 +1,65 @@
+"""
+Conditional GET and per-user response caching.
+
+``conditional_get`` wraps an ``APIView.get`` method. It derives a strong
+ETag from the user's data version (see ``apps.items.versions``), the path,
+the query string and the Accept header. If ``If-None-Match`` matches, it
+returns 304 before the view runs. Otherwise the response data is served
+from Django's cache when possible and stored there after a successful
+render. Nothing is ever deleted: a version bump changes every key.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from . import versions
+
+
+def _fingerprint(request: Request, version: int) -> str:
+    query = sorted(request.query_params.lists())
+    raw = f"{request.user.id}:{version}:{request.path}:{query}:{request.META.get('HTTP_ACCEPT', '')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return etag in candidates
+
+
+def conditional_get(view_method):
+    @functools.wraps(view_method)
+    def wrapper(self, request: Request, *args, **kwargs) -> Response:
+        version = versions.get_version(request.user.id)
+        fingerprint = _fingerprint(request, version)
+        etag = f'"{fingerprint[:32]}"'
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f"keepr:response:{fingerprint}"
+            data = cache.get(cache_key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+
+        response["ETag"] = etag
+        # Responses are per user, so shared caches must not store them
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    return wrapper
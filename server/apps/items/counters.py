@@ -0,0 +1,202 @@
+"""
+Per-user item counters.
+
+``ItemCounter`` rows hold the number of items and bytes stored for each
+user, broken down by type and tag, so listings can report totals without
+running COUNT(*). Callers record every mutation inside the same transaction
+as the change itself:
+
+* ``record_added`` after items (and their tags) are inserted
+* ``record_removed`` before items are deleted
+* ``record_retagged`` when an item's tag set changes
+* ``record_tag_links`` after batch tagging, or before batch untagging
+* ``record_type_changed`` before items change type
+
+Counters for a user are built lazily from the items table the first time
+they are needed, and can be rebuilt with ``manage.py rebuild_item_counters``.
+"""
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Item, ItemCounter, ItemTag
+
+TOTAL_KEY = "total"
+
+
+def type_key(item_type: str) -> str:
+    return f"type:{item_type}"
+
+
+def tag_key(tag_id: uuid.UUID | str) -> str:
+    return f"tag:{tag_id}"
+
+
+def key_for_filters(tag_ids: list[str], item_type: str | None, query: str) -> str | None:
+    """Return the counter that holds the total for a listing, if there is one.
+
+    Only unfiltered listings and listings filtered by a single type or a
+    single tag have a counter; anything else needs a COUNT query.
+    """
+    if query:
+        return None
+    if not tag_ids and not item_type:
+        return TOTAL_KEY
+    if item_type and not tag_ids:
+        return type_key(item_type)
+    if len(tag_ids) == 1 and not item_type:
+        return tag_key(tag_ids[0])
+    return None
+
+
+def _collect(items: QuerySet) -> dict[str, list[int]]:
+    """Compute ``{key: [count, bytes]}`` for ``items`` with two grouped queries."""
+    totals: dict[str, list[int]] = {TOTAL_KEY: [0, 0]}
+
+    by_type = (
+        items.order_by()
+        .values("type")
+        .annotate(n=Count("id"), size=Coalesce(Sum("file_size"), 0))
+    )
+    for row in by_type:
+        totals[type_key(row["type"])] = [row["n"], row["size"]]
+        totals[TOTAL_KEY][0] += row["n"]
+        totals[TOTAL_KEY][1] += row["size"]
+
+    by_tag = (
+        ItemTag.objects.filter(item__in=items.order_by().values("id"))
+        .values("tag_id")
+        .annotate(n=Count("id"), size=Coalesce(Sum("item__file_size"), 0))
+    )
+    for row in by_tag:
+        totals[tag_key(row["tag_id"])] = [row["n"], row["size"]]
+
+    return totals
+
+
+def _is_initialized(user_id) -> bool:
+    return ItemCounter.objects.filter(user_id=user_id, key=TOTAL_KEY).exists()
+
+
+def _apply(user_id, deltas: dict[str, list[int]], sign: int = 1) -> None:
+    for key, (count, size) in deltas.items():
+        if not count and not size:
+            continue
+        updated = ItemCounter.objects.filter(user_id=user_id, key=key).update(
+            count=F("count") + sign * count,
+            bytes=F("bytes") + sign * size,
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                ItemCounter.objects.create(user_id=user_id, key=key, count=sign * count, bytes=sign * size)
+        except IntegrityError:
+            # Created concurrently by another request
+            ItemCounter.objects.filter(user_id=user_id, key=key).update(
+                count=F("count") + sign * count,
+                bytes=F("bytes") + sign * size,
+            )
+
+
+@transaction.atomic
+def rebuild(user_id) -> None:
+    """Recompute every counter for a user from the items table."""
+    ItemCounter.objects.filter(user_id=user_id).delete()
+    totals = _collect(Item.objects.filter(user_id=user_id))
+    ItemCounter.objects.bulk_create([
+        ItemCounter(user_id=user_id, key=key, count=count, bytes=size)
+        for key, (count, size) in totals.items()
+    ])
+
+
+def record_added(user_id, items: QuerySet) -> None:
+    """Count ``items``, which must already be saved with their tags."""
+    if not _is_initialized(user_id):
+        rebuild(user_id)
+        return
+    _apply(user_id, _collect(items))
+
+
+def record_removed(user_id, items: QuerySet) -> None:
+    """Uncount ``items``; call before deleting them."""
+    if not _is_initialized(user_id):
+        # Rebuilding now would include the rows about to be deleted
+        return
+    _apply(user_id, _collect(items), sign=-1)
+
+
+def record_retagged(user_id, item: Item, old_tag_ids, new_tag_ids) -> None:
+    if not _is_initialized(user_id):
+        rebuild(user_id)
+        return
+    old_tag_ids = {str(tag_id) for tag_id in old_tag_ids}
+    new_tag_ids = {str(tag_id) for tag_id in new_tag_ids}
+    size = item.file_size or 0
+    deltas = {tag_key(tag_id): [1, size] for tag_id in new_tag_ids - old_tag_ids}
+    deltas.update({tag_key(tag_id): [-1, -size] for tag_id in old_tag_ids - new_tag_ids})
+    _apply(user_id, deltas)
+
+
+def record_tag_links(user_id, links: Iterable[tuple], sign: int = 1) -> None:
+    """Count ``(tag_id, file_size)`` pairs for ItemTag rows that were just added.
+
+    With ``sign=-1``, uncount rows that are about to be deleted.
+    """
+    if not _is_initialized(user_id):
+        if sign > 0:
+            rebuild(user_id)
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    for tag_id, size in links:
+        deltas[tag_key(tag_id)][0] += 1
+        deltas[tag_key(tag_id)][1] += size or 0
+    _apply(user_id, deltas, sign)
+
+
+def record_type_changed(user_id, items: QuerySet, new_type: str) -> None:
+    """Move ``items`` to ``new_type``'s counter; call before updating them."""
+    if not _is_initialized(user_id):
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    rows = items.order_by().values("type").annotate(n=Count("id"), size=Coalesce(Sum("file_size"), 0))
+    for row in rows:
+        if row["type"] == new_type:
+            continue
+        deltas[type_key(row["type"])][0] -= row["n"]
+        deltas[type_key(row["type"])][1] -= row["size"]
+        deltas[type_key(new_type)][0] += row["n"]
+        deltas[type_key(new_type)][1] += row["size"]
+    _apply(user_id, deltas)
+
+
+def forget_tag(user_id, tag_id) -> None:
+    ItemCounter.objects.filter(user_id=user_id, key=tag_key(tag_id)).delete()
+
+
+def get_count(user_id, key: str = TOTAL_KEY) -> int:
+    """Return the stored count for ``key``, building counters if needed."""
+    rows = dict(
+        ItemCounter.objects.filter(user_id=user_id, key__in=(TOTAL_KEY, key)).values_list("key", "count")
+    )
+    if TOTAL_KEY not in rows:
+        rebuild(user_id)
+        return get_count(user_id, key)
+    return rows.get(key, 0)
+
+
+def get_counts(user_id) -> dict[str, int]:
+    """Return every stored count for a user as ``{key: count}``, building counters if needed."""
+    rows = dict(ItemCounter.objects.filter(user_id=user_id).values_list("key", "count"))
+    if TOTAL_KEY not in rows:
+        rebuild(user_id)
+        return get_counts(user_id)
+    return rows
+
+
+def get_global_total() -> int:
+    return ItemCounter.objects.filter(key=TOTAL_KEY).aggregate(total=Coalesce(Sum("count"), 0))["total"]
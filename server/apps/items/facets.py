@@ -0,0 +1,62 @@
+"""
+Per-type and per-tag item counts for the sidebar.
+
+Without filters the counts come straight from the counters table (see
+``apps.items.counters``). A filtered listing is counted with a single
+round trip: one grouped aggregate per facet, combined with UNION ALL. The
+view caches the result under the user's data version.
+"""
+import uuid
+
+from django.db.models import CharField, Count, F, QuerySet, Value
+from django.db.models.functions import Cast
+
+from . import counters
+from .models import ItemTag, ItemType
+
+TYPE_FACET = "type"
+TAG_FACET = "tag"
+
+
+def _empty() -> dict:
+    return {"total": 0, "types": {item_type: 0 for item_type in ItemType.values}, "tags": {}}
+
+
+def stored_counts(user_id) -> dict:
+    """Facet counts over all of a user's items, read from the counters table."""
+    facets = _empty()
+    for key, count in counters.get_counts(user_id).items():
+        if key == counters.TOTAL_KEY:
+            facets["total"] = count
+        elif key.startswith("type:"):
+            facets["types"][key.removeprefix("type:")] = count
+        elif key.startswith("tag:") and count > 0:
+            facets["tags"][key.removeprefix("tag:")] = count
+    return facets
+
+
+def count(items: QuerySet) -> dict:
+    """Facet counts over ``items``, which may carry any list filters."""
+    items = items.order_by()
+    by_type = (
+        items.values("type")
+        .annotate(facet=Value(TYPE_FACET), value=F("type"), n=Count("id"))
+        .values_list("facet", "value", "n")
+    )
+    by_tag = (
+        ItemTag.objects.filter(item__in=items.values("id"))
+        .values("tag_id")
+        .annotate(facet=Value(TAG_FACET), value=Cast("tag_id", CharField()), n=Count("id"))
+        .values_list("facet", "value", "n")
+    )
+
+    facets = _empty()
+    for facet, value, n in by_type.union(by_tag, all=True):
+        if facet == TYPE_FACET:
+            facets["types"][value] = n
+            # Every item has exactly one type, so these add up to the total
+            facets["total"] += n
+        else:
+            # SQLite stores UUIDs without dashes
+            facets["tags"][str(uuid.UUID(value))] = n
+    return facets
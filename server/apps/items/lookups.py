@@ -0,0 +1,22 @@
+from django.db.models.lookups import IContains
+
+
+class TrigramContains(IContains):
+    """Case-insensitive substring match that a trigram index can serve.
+
+    On PostgreSQL, ``icontains`` compiles to ``UPPER(col::text) LIKE UPPER(%s)``,
+    which a ``gin_trgm_ops`` index on the bare column cannot serve. This lookup
+    emits ``col ILIKE %s`` instead. Other databases use their ``icontains``
+    operator.
+    """
+
+    lookup_name = "trigram_contains"
+
+    def get_rhs_op(self, connection, rhs):
+        return connection.operators["icontains"] % rhs
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        params.extend(rhs_params)
+        return f"{lhs_sql} ILIKE {rhs_sql}", params
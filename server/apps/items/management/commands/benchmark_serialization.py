@@ -0,0 +1,121 @@
+import json
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.renderers import ORJSONRenderer
+from apps.items import serialization
+from apps.items.models import Item, ItemTag, ItemType, Tag
+from apps.items.pagination import KEYSET_ORDERING
+
+User = get_user_model()
+
+
+def _model_rows(items) -> list[dict]:
+    """The item list's former path: model instances, prefetched tags, per-row dicts."""
+    result = []
+    for item in items.prefetch_related("item_tags__tag"):
+        tags = [it.tag for it in item.item_tags.all()]
+        item_data = {
+            "id": str(item.id),
+            "type": item.type,
+            "title": item.title,
+            "file_name": item.file_name,
+            "file_size": item.file_size,
+            "file_mimetype": item.file_mimetype,
+            "is_pinned": item.is_pinned,
+            "created_at": item.created_at.isoformat(),
+            "updated_at": item.updated_at.isoformat(),
+            "tags": [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags],
+        }
+        if item.content and item.type in (ItemType.TEXT, ItemType.LOGIN):
+            if item.type == ItemType.LOGIN:
+                item_data["content"] = json.loads(item.content)
+            else:
+                item_data["content"] = item.content
+        result.append(item_data)
+    return result
+
+
+def _value_rows(items) -> list[dict]:
+    fields = serialization.LIST_FIELDS
+    return serialization.serialize(list(serialization.select(items, fields)), fields)
+
+
+def _rendered(rows: list[dict]) -> bytes:
+    # The former tag order was unspecified
+    rows = [{**row, "tags": sorted(row["tags"], key=lambda tag: str(tag["id"]))} for row in rows]
+    return ORJSONRenderer().render(rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare item list serialization throughput against the former model "
+        "instance path. The data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="20,100,1000", help="Comma-separated page sizes.")
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        rng = random.Random(0)
+
+        with transaction.atomic():
+            user = self._generate(rng, max(sizes), options["tags"])
+            base = Item.objects.filter(user=user).order_by(*KEYSET_ORDERING)
+
+            # Both paths must produce the same response
+            assert _rendered(_model_rows(base)) == _rendered(_value_rows(base))
+
+            self.stdout.write(f"Median of {options['repeat']} runs, database fetch included\n")
+            self.stdout.write(f"{'rows':>6}{'model instances':>22}{'values()':>22}{'speedup':>10}")
+            for size in sizes:
+                page = base[:size]
+                before = self._time(lambda: _model_rows(page.all()), options["repeat"])
+                after = self._time(lambda: _value_rows(page.all()), options["repeat"])
+                self.stdout.write(
+                    f"{size:>6}{before:>9.2f} ms {size / before * 1000:>8.0f}/s"
+                    f"{after:>9.2f} ms {size / after * 1000:>8.0f}/s{before / after:>9.2f}x"
+                )
+
+            transaction.set_rollback(True)
+
+    def _generate(self, rng: random.Random, count: int, tag_count: int) -> User:
+        user = User.objects.create_user(
+            username=f"benchmark-{uuid.uuid4().hex[:8]}", email="benchmark@localhost", password=None
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=f"tag {n}", color="#6366f1") for n in range(tag_count)
+        ])
+        items = Item.objects.bulk_create([
+            Item(
+                user=user,
+                type=ItemType.LOGIN if n % 10 == 0 else ItemType.TEXT,
+                title=f"note {n}",
+                content=json.dumps({"username": "user", "password": "secret"}) if n % 10 == 0 else "lorem ipsum " * 40,
+                is_pinned=n % 50 == 0,
+            )
+            for n in range(count)
+        ])
+        ItemTag.objects.bulk_create([
+            ItemTag(item=item, tag=tag)
+            for item in items
+            for tag in rng.sample(tags, rng.randint(0, min(3, len(tags))))
+        ])
+        return user
+
+    def _time(self, run, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.items import filters
+from apps.items.models import Item, ItemTag, ItemType, Tag
+from apps.items.pagination import DEFAULT_PAGE_SIZE, KEYSET_ORDERING
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the item list tag filters on a generated archive. The data is "
+        "created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100_000)
+        parser.add_argument("--tags", type=int, default=200)
+        parser.add_argument("--tags-per-item", type=int, default=3)
+        parser.add_argument("--filter-tags", type=int, default=3, help="Number of tags in each filter.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--explain", action="store_true", help="Print the query plan for each strategy.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            user, tags = self._generate(rng, options)
+            # Pick among the most used tags so that "all" has matches too
+            tag_ids = [str(tag.id) for tag in rng.sample(tags[:20], min(options["filter_tags"], len(tags[:20])))]
+            base = Item.objects.filter(user=user)
+
+            strategies = [
+                ("join + DISTINCT (old)", base.filter(item_tags__tag_id__in=tag_ids).distinct()),
+                ("any: EXISTS", filters.filter_by_tags(base, tag_ids, filters.TAG_MODE_ANY)),
+                ("all: GROUP BY/HAVING", filters.filter_by_tags(base, tag_ids, filters.TAG_MODE_ALL)),
+            ]
+
+            self.stdout.write(
+                f"{options['items']} items, {options['tags']} tags, {options['tags_per_item']} tags per item, "
+                f"filtering on {len(tag_ids)} tags ({connection.vendor}); median of {options['repeat']} runs\n"
+            )
+            self.stdout.write(f"{'strategy':<24}{'matches':>9}{'first page':>13}{'count':>11}")
+            for name, items in strategies:
+                first_page = items.order_by(*KEYSET_ORDERING).values_list("id", flat=True)[:DEFAULT_PAGE_SIZE]
+                # .all() clones the queryset so every run goes to the database
+                page_ms = self._time(lambda: list(first_page.all()), options["repeat"])
+                count_ms = self._time(items.count, options["repeat"])
+                self.stdout.write(f"{name:<24}{items.count():>9}{page_ms:>10.1f} ms{count_ms:>8.1f} ms")
+                if options["explain"]:
+                    self.stdout.write(first_page.explain() + "\n")
+
+            transaction.set_rollback(True)
+
+    def _generate(self, rng: random.Random, options) -> tuple[User, list[Tag]]:
+        """Create the benchmark user; returns its tags, most used first."""
+        user = User.objects.create_user(
+            username=f"benchmark-{uuid.uuid4().hex[:8]}", email="benchmark@localhost", password=None
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=f"tag {n}", color="#6366f1") for n in range(options["tags"])
+        ])
+        # Skew tag popularity so filters mix common and rare tags
+        weights = [1 / (rank + 1) for rank in range(len(tags))]
+
+        batch_size = 5000
+        for start in range(0, options["items"], batch_size):
+            items = Item.objects.bulk_create([
+                Item(user=user, type=ItemType.TEXT, title=f"note {n}", content=f"benchmark note {n}")
+                for n in range(start, min(start + batch_size, options["items"]))
+            ])
+            item_tags = []
+            for item in items:
+                chosen = {rng.choices(tags, weights)[0] for _ in range(options["tags_per_item"])}
+                item_tags.extend(ItemTag(item=item, tag=tag) for tag in chosen)
+            ItemTag.objects.bulk_create(item_tags)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE items, item_tags")
+        return user, tags
+
+    def _time(self, query, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
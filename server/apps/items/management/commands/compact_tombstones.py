@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.items import sync
+
+
+class Command(BaseCommand):
+    help = "Delete delta-sync tombstones older than SYNC_TOMBSTONE_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SYNC_TOMBSTONE_DAYS, help="Keep tombstones this many days.")
+
+    def handle(self, *args, **options):
+        deleted = sync.compact(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s)"))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.items import uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Hash completed resumable uploads and turn them into items. Runs until "
+        "no upload is waiting, or forever with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--loop", action="store_true", help="Keep polling for completed uploads.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            finished = failures = 0
+            while True:
+                batch_finished, batch_failures = uploads.finish(options["batch_size"])
+                finished += batch_finished
+                failures += batch_failures
+                if batch_finished + batch_failures < options["batch_size"]:
+                    break
+
+            if finished or failures or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Finished {finished} upload(s)")
+                    + (f"; {failures} failure(s), retried later" if failures else "")
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.items import previews, videos
+from apps.items.models import Item, ItemType
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the pixel size of image items created without one, then extract "
+        "posters and metadata for queued video items. Runs until the video queue "
+        "has no due jobs, or forever with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--thumbnails", action="store_true",
+            help="Also generate every configured thumbnail width, instead of waiting for the first request.",
+        )
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the video queue.")
+        parser.add_argument("--interval", type=float, default=10.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        if previews.HAS_PILLOW:
+            self.handle_images(options["thumbnails"])
+        else:
+            self.stderr.write("Pillow is not installed; skipping images")
+
+        if not videos.available():
+            self.stderr.write(f"{settings.FFPROBE_PATH} or {settings.FFMPEG_PATH} not found; skipping videos")
+            return
+
+        # Videos created before the queue existed, or imported
+        unprocessed = Item.objects.filter(media_codec__isnull=True, preview_job__isnull=True)
+        queued = videos.enqueue(unprocessed)
+        if queued:
+            self.stdout.write(f"Queued {queued} video(s)")
+
+        while True:
+            done = failures = 0
+            while True:
+                batch_done, batch_failures = videos.process(options["batch_size"])
+                done += batch_done
+                failures += batch_failures
+                if batch_done + batch_failures < options["batch_size"]:
+                    break
+
+            if done or failures or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Processed {done} video(s)")
+                    + (f"; {failures} failure(s)" if failures else "")
+                    + f"; {videos.pending()} still queued"
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def handle_images(self, thumbnails: bool) -> None:
+        images = Item.objects.filter(type=ItemType.IMAGE).exclude(file_path="")
+        sized = unreadable = 0
+        for item in images.filter(media_width__isnull=True).only("id", "user_id", "file_path").iterator():
+            if previews.record_size(item):
+                sized += 1
+            else:
+                unreadable += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Recorded the size of {sized} image(s)")
+            + (f"; {unreadable} could not be read" if unreadable else "")
+        )
+
+        if not thumbnails:
+            return
+        generated = 0
+        for item in images.only("id", "file_path", "file_sha256").iterator():
+            for width in settings.THUMBNAIL_WIDTHS:
+                if previews.thumbnail(item, width) is not None:
+                    generated += 1
+        self.stdout.write(self.style.SUCCESS(f"{generated} thumbnail(s) ready"))
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.items import counters
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute per-user item counters from the items table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild counters for this username.")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(username=options["user"])
+
+        rebuilt = 0
+        for user_id in users.values_list("id", flat=True):
+            counters.rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt item counters for {rebuilt} user(s)"))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.items.models import Item
+from apps.items.search import search_vector_expression, uses_postgres_search, uses_sqlite_fts
+
+# Keep in sync with migration 0016_item_fts5_index
+FTS_CLEAR_SQL = ["DELETE FROM items_fts", "DELETE FROM items_fts_map"]
+FTS_POPULATE_SQL = [
+    """
+    INSERT INTO items_fts_map (item_id)
+    SELECT id FROM items WHERE id NOT IN (SELECT item_id FROM items_fts_map)
+    """,
+    """
+    INSERT INTO items_fts (rowid, item_id, title, file_name, content, tags)
+    SELECT m.fts_rowid, i.id, i.title, i.file_name, i.content, (
+        SELECT group_concat(t.name, ' ') FROM item_tags it JOIN tags t ON t.id = it.tag_id
+        WHERE it.item_id = i.id
+    )
+    FROM items i JOIN items_fts_map m ON m.item_id = i.id
+    WHERE m.fts_rowid NOT IN (SELECT rowid FROM items_fts)
+    """,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Populate Item.search_vector (PostgreSQL) or the items_fts index (SQLite) "
+        "for existing rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every row instead of only rows missing from the index.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if uses_sqlite_fts():
+            self._rebuild_fts(options["all"])
+            return
+
+        if not uses_postgres_search():
+            self.stdout.write("No full-text index is used on this database; nothing to do.")
+            return
+
+        items = Item.objects.all()
+        if not options["all"]:
+            items = items.filter(search_vector__isnull=True)
+
+        batch_size = options["batch_size"]
+        ids = list(items.order_by().values_list("id", flat=True))
+        updated = 0
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            updated += Item.objects.filter(id__in=batch).update(search_vector=search_vector_expression())
+
+        self.stdout.write(self.style.SUCCESS(f"Updated search vectors for {updated} item(s)"))
+
+    def _rebuild_fts(self, rebuild_all: bool):
+        with transaction.atomic(), connection.cursor() as cursor:
+            if rebuild_all:
+                for sql in FTS_CLEAR_SQL:
+                    cursor.execute(sql)
+            for sql in FTS_POPULATE_SQL:
+                cursor.execute(sql)
+            added = cursor.rowcount
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {added} item(s) for full-text search"))
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.items import suggestions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute the search-as-you-type suggestion terms from items and tags."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild suggestions for this username.")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(username=options["user"])
+
+        rebuilt = 0
+        for user_id in users.values_list("id", flat=True):
+            suggestions.rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt suggestions for {rebuilt} user(s)"))
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.items import blobs, previews, reclaim, uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete files queued by item deletion and expired uploads, blobs no item "
+        "uses, and the least recently used thumbnails over the cache budget. Runs until the queue has no due files, or forever with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the queue.")
+        parser.add_argument("--interval", type=float, default=10.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = uploads.expire_sessions()
+            if expired:
+                self.stdout.write(f"Expired {expired} unfinished upload(s)")
+
+            evicted, evicted_bytes = previews.evict()
+            if evicted:
+                self.stdout.write(f"Evicted {evicted} thumbnail(s), {evicted_bytes} bytes")
+
+            files, size, failures = blobs.collect(options["batch_size"])
+            while True:
+                batch_files, batch_bytes, batch_failures = reclaim.process(options["batch_size"])
+                files += batch_files
+                size += batch_bytes
+                failures += batch_failures
+                if batch_files + batch_failures < options["batch_size"]:
+                    break
+
+            if files or failures or not options["loop"]:
+                pending = reclaim.pending()
+                unused = blobs.unused()
+                self.stdout.write(
+                    self.style.SUCCESS(f"Reclaimed {files} file(s), {size} bytes")
+                    + (f"; {failures} failure(s)" if failures else "")
+                    + f"; {pending['files'] + unused['files']} file(s), "
+                    f"{pending['bytes'] + unused['bytes']} bytes still queued"
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
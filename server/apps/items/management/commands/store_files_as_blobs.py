@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.items import blobs
+from apps.items.models import Item
+
+
+class Command(BaseCommand):
+    help = "Move files stored before the blob store into it, dropping duplicate copies."
+
+    def handle(self, *args, **options):
+        adopted = missing = 0
+        items = Item.objects.filter(file_sha256="").exclude(file_path="").only("id", "file_path")
+        for item in items.iterator():
+            if blobs.adopt(item):
+                adopted += 1
+            else:
+                missing += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {adopted} file(s) as blobs")
+            + (f"; skipped {missing} item(s) whose file is missing" if missing else "")
+        )
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Keep in sync with apps.items.search.search_vector_expression()
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION items_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.file_name, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_search_vector_trigger ON items;
+CREATE TRIGGER items_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, file_name, content ON items
+    FOR EACH ROW EXECUTE FUNCTION items_search_vector_update();
+
+CREATE INDEX IF NOT EXISTS items_search_vector_gin ON items USING gin (search_vector);
+"""
+
+DROP_TRIGGER_SQL = """
+DROP INDEX IF EXISTS items_search_vector_gin;
+DROP TRIGGER IF EXISTS items_search_vector_trigger ON items;
+DROP FUNCTION IF EXISTS items_search_vector_update();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0007_rename_items_shared_slug_idx_shared_item_slug_16696f_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
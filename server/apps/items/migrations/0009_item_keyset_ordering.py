@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_item_search_vector_trigger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='item',
+            options={'ordering': ('-is_pinned', '-created_at', 'id')},
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['user', '-is_pinned', '-created_at', 'id'], name='items_user_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Item = apps.get_model("items", "Item")
+    ItemTag = apps.get_model("items", "ItemTag")
+    ItemCounter = apps.get_model("items", "ItemCounter")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    counters = {}
+    for user_id in User.objects.values_list("id", flat=True):
+        counters[(user_id, "total")] = [0, 0]
+
+    by_type = Item.objects.values("user_id", "type").annotate(n=Count("id"), size=Coalesce(Sum("file_size"), 0))
+    for row in by_type:
+        counters[(row["user_id"], f"type:{row['type']}")] = [row["n"], row["size"]]
+        total = counters[(row["user_id"], "total")]
+        total[0] += row["n"]
+        total[1] += row["size"]
+
+    by_tag = ItemTag.objects.values("item__user_id", "tag_id").annotate(
+        n=Count("id"), size=Coalesce(Sum("item__file_size"), 0)
+    )
+    for row in by_tag:
+        counters[(row["item__user_id"], f"tag:{row['tag_id']}")] = [row["n"], row["size"]]
+
+    ItemCounter.objects.bulk_create(
+        [
+            ItemCounter(user_id=user_id, key=key, count=count, bytes=size)
+            for (user_id, key), (count, size) in counters.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0009_item_keyset_ordering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'item_counters',
+                'unique_together': {('user', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
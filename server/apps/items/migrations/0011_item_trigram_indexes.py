@@ -0,0 +1,34 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+CREATE_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS items_title_trgm ON items USING gin (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS items_file_name_trgm ON items USING gin (file_name gin_trgm_ops);
+"""
+
+DROP_INDEXES_SQL = """
+DROP INDEX IF EXISTS items_title_trgm;
+DROP INDEX IF EXISTS items_file_name_trgm;
+"""
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_INDEXES_SQL)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_INDEXES_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0010_itemcounter'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
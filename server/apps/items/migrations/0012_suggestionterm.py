@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_terms(apps, schema_editor):
+    Item = apps.get_model("items", "Item")
+    Tag = apps.get_model("items", "Tag")
+    SuggestionTerm = apps.get_model("items", "SuggestionTerm")
+
+    terms = {}
+
+    def add(user_id, kind, text, count):
+        text = (text or "").strip()[:200]
+        if not text:
+            return
+        entry = terms.setdefault((user_id, kind, text.lower()), [text, 0])
+        entry[1] += count
+
+    for field, kind in (("title", "title"), ("file_name", "file")):
+        for row in Item.objects.values("user_id", field).annotate(n=Count("id")):
+            add(row["user_id"], kind, row[field], row["n"])
+    for user_id, name in Tag.objects.values_list("user_id", "name"):
+        add(user_id, "tag", name, 1)
+
+    SuggestionTerm.objects.bulk_create(
+        [
+            SuggestionTerm(user_id=user_id, kind=kind, term=term, display=display, count=count)
+            for (user_id, kind, term), (display, count) in terms.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0011_item_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('title', 'Title'), ('file', 'File name'), ('tag', 'Tag')], max_length=10)),
+                ('term', models.CharField(max_length=200)),
+                ('display', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'suggestion_terms',
+                'indexes': [models.Index(fields=['user', 'term'], name='suggestion_user_term_idx', opclasses=['', 'varchar_pattern_ops'])],
+                'unique_together': {('user', 'kind', 'term')},
+            },
+        ),
+        migrations.RunPython(populate_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0012_suggestionterm'),
+        ('users', '0004_alter_user_create_shortcut'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'user_data_versions',
+            },
+        ),
+    ]
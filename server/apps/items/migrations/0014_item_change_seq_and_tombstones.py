@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0013_userdataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.UUIDField()),
+                ('change_seq', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'item_tombstones',
+            },
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userdataversion',
+            name='sync_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['user', 'change_seq'], name='items_user_change_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='itemtombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='itemtombstone',
+            index=models.Index(fields=['user', 'change_seq'], name='item_tombst_user_id_412c70_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemtombstone',
+            index=models.Index(fields=['deleted_at'], name='item_tombst_deleted_9a4464_idx'),
+        ),
+    ]
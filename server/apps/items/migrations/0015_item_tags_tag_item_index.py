@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0014_item_change_seq_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemtag',
+            index=models.Index(fields=['tag', 'item'], name='item_tags_tag_item_idx'),
+        ),
+    ]
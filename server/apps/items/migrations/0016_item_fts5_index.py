@@ -0,0 +1,120 @@
+from django.db import migrations
+
+# SQLite only. items_fts is an FTS5 index over each item's text and tag names.
+# Its rowids come from items_fts_map, whose INTEGER PRIMARY KEY survives VACUUM
+# (the implicit rowid of items does not). Keep in sync with apps.items.search.
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE items_fts USING fts5(
+        item_id UNINDEXED, title, file_name, content, tags,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TABLE items_fts_map (
+        fts_rowid INTEGER PRIMARY KEY,
+        item_id char(32) NOT NULL UNIQUE
+    )
+    """,
+    # Default ranking for the hidden rank column: title and file name weigh most
+    "INSERT INTO items_fts (items_fts, rank) VALUES ('rank', 'bm25(0.0, 10.0, 10.0, 4.0, 6.0)')",
+    """
+    CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts_map (item_id) VALUES (new.id);
+        INSERT INTO items_fts (rowid, item_id, title, file_name, content, tags)
+        VALUES (last_insert_rowid(), new.id, new.title, new.file_name, new.content, '');
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_update AFTER UPDATE OF title, file_name, content ON items BEGIN
+        UPDATE items_fts SET title = new.title, file_name = new.file_name, content = new.content
+        WHERE rowid = (SELECT fts_rowid FROM items_fts_map WHERE item_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN
+        DELETE FROM items_fts WHERE rowid = (SELECT fts_rowid FROM items_fts_map WHERE item_id = old.id);
+        DELETE FROM items_fts_map WHERE item_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_tag_insert AFTER INSERT ON item_tags BEGIN
+        UPDATE items_fts SET tags = (
+            SELECT group_concat(t.name, ' ') FROM item_tags it JOIN tags t ON t.id = it.tag_id
+            WHERE it.item_id = new.item_id
+        )
+        WHERE rowid = (SELECT fts_rowid FROM items_fts_map WHERE item_id = new.item_id);
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_tag_delete AFTER DELETE ON item_tags BEGIN
+        UPDATE items_fts SET tags = (
+            SELECT group_concat(t.name, ' ') FROM item_tags it JOIN tags t ON t.id = it.tag_id
+            WHERE it.item_id = old.item_id
+        )
+        WHERE rowid = (SELECT fts_rowid FROM items_fts_map WHERE item_id = old.item_id);
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_tag_rename AFTER UPDATE OF name ON tags BEGIN
+        UPDATE items_fts SET tags = (
+            SELECT group_concat(t.name, ' ') FROM item_tags it JOIN tags t ON t.id = it.tag_id
+            WHERE it.item_id = items_fts.item_id
+        )
+        WHERE rowid IN (
+            SELECT m.fts_rowid FROM item_tags it JOIN items_fts_map m ON m.item_id = it.item_id
+            WHERE it.tag_id = new.id
+        );
+    END
+    """,
+    "INSERT INTO items_fts_map (item_id) SELECT id FROM items",
+    """
+    INSERT INTO items_fts (rowid, item_id, title, file_name, content, tags)
+    SELECT m.fts_rowid, i.id, i.title, i.file_name, i.content, (
+        SELECT group_concat(t.name, ' ') FROM item_tags it JOIN tags t ON t.id = it.tag_id
+        WHERE it.item_id = i.id
+    )
+    FROM items i JOIN items_fts_map m ON m.item_id = i.id
+    """,
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS items_fts_tag_rename",
+    "DROP TRIGGER IF EXISTS items_fts_tag_delete",
+    "DROP TRIGGER IF EXISTS items_fts_tag_insert",
+    "DROP TRIGGER IF EXISTS items_fts_delete",
+    "DROP TRIGGER IF EXISTS items_fts_update",
+    "DROP TRIGGER IF EXISTS items_fts_insert",
+    "DROP TABLE IF EXISTS items_fts_map",
+    "DROP TABLE IF EXISTS items_fts",
+]
+
+
+def _has_fts5(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_fts(apps, schema_editor):
+    # Without FTS5 compiled in, search keeps using icontains
+    if schema_editor.connection.vendor == "sqlite" and _has_fts5(schema_editor.connection):
+        for sql in CREATE_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0015_item_tags_tag_item_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0016_item_fts5_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileReclaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=1000)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'file_reclaims',
+                'indexes': [models.Index(fields=['next_attempt_at'], name='file_reclai_next_at_2c5b97_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:02
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0017_file_reclaims'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('text', 'Text'), ('login', 'Login'), ('image', 'Image'), ('video', 'Video'), ('file', 'File')], max_length=10)),
+                ('title', models.CharField(blank=True, max_length=500, null=True)),
+                ('file_name', models.CharField(max_length=500)),
+                ('file_size', models.BigIntegerField()),
+                ('file_mimetype', models.CharField(max_length=200)),
+                ('tag_ids', models.JSONField(default=list)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'upload_sessions',
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='items.uploadsession')),
+            ],
+            options={
+                'db_table': 'upload_chunks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='uploadsession',
+            index=models.Index(fields=['expires_at'], name='upload_sess_expires_aebd1e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='uploadchunk',
+            unique_together={('session', 'index')},
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:05
+
+import importlib
+
+from django.db import migrations, models
+
+fts = importlib.import_module("apps.items.migrations.0016_item_fts5_index")
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # SQLite adds the column by rebuilding the items table, which drops its FTS triggers
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'")
+        if cursor.fetchone() is None:
+            return
+    for sql in fts.CREATE_FTS_SQL:
+        if "TRIGGER" in sql and " ON items " in sql:
+            name = sql.split("TRIGGER", 1)[1].split()[0]
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0018_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AddField(
+            model_name='item',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'blobs',
+                'indexes': [models.Index(fields=['ref_count'], name='blobs_ref_cou_522d5f_idx')],
+            },
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
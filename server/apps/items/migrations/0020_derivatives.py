@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0019_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='media_height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='media_width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Derivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=64)),
+                ('name', models.CharField(max_length=50)),
+                ('size', models.BigIntegerField()),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'derivatives',
+                'indexes': [models.Index(fields=['used_at'], name='derivatives_used_at_d97a50_idx')],
+                'unique_together': {('source', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0020_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='media_codec',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='media_duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PreviewJob',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='preview_job', serialize=False, to='items.item')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'preview_jobs',
+                'indexes': [models.Index(fields=['next_attempt_at'], name='preview_job_next_at_7d1ea4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0021_videos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='items.item'),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('receiving', 'Receiving chunks'), ('finishing', 'Finishing'), ('complete', 'Complete'), ('failed', 'Failed')], default='receiving', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='uploadsession',
+            index=models.Index(fields=['status'], name='upload_sess_status_f1db9b_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0022_upload_finishing'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='suggestionterm',
+            name='suggestion_user_term_idx',
+        ),
+    ]
@@ -44,6 +44,14 @@ class Item(models.Model):
     file_name = models.CharField(max_length=500, blank=True)
     file_size = models.BigIntegerField(blank=True, null=True)  # in bytes
     file_mimetype = models.CharField(max_length=200, blank=True)
+    # Blob holding the file (see apps.items.blobs); empty for files stored before blobs
+    file_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    # Pixel size of images, read when the file is stored (see apps.items.previews),
+    # and of videos, with their length and codec (see apps.items.videos)
+    media_width = models.PositiveIntegerField(blank=True, null=True)
+    media_height = models.PositiveIntegerField(blank=True, null=True)
+    media_duration = models.FloatField(blank=True, null=True)  # in seconds
+    media_codec = models.CharField(max_length=50, blank=True, null=True)
 
     is_pinned = models.BooleanField(default=False)
 
@@ -53,13 +61,19 @@ class Item(models.Model):
     # Full-text search vector
     search_vector = SearchVectorField(null=True, blank=True)
 
+    # User data version of the last change, for delta sync (see apps.items.sync)
+    change_seq = models.BigIntegerField(default=0)
+
     class Meta:
         db_table = "items"
-        ordering = ("-is_pinned", "-created_at")
+        ordering = ("-is_pinned", "-created_at", "id")
         indexes = [
             models.Index(fields=["user", "-created_at"]),
             models.Index(fields=["user", "type"]),
             models.Index(fields=["user", "-is_pinned"]),
+            # Matches the default ordering exactly, for keyset pagination
+            models.Index(fields=["user", "-is_pinned", "-created_at", "id"], name="items_user_keyset_idx"),
+            models.Index(fields=["user", "change_seq"], name="items_user_change_seq_idx"),
         ]
 
     def __str__(self) -> str:
@@ -73,11 +87,260 @@ class ItemTag(models.Model):
     class Meta:
         db_table = "item_tags"
         unique_together = ("item", "tag")
+        indexes = [
+            # Lets tag filters read item ids straight from the index
+            models.Index(fields=["tag", "item"], name="item_tags_tag_item_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.item} - {self.tag}"
 
 
+class ItemCounter(models.Model):
+    """Per-user item totals, maintained incrementally by apps.items.counters."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="item_counters")
+    key = models.CharField(max_length=50)  # "total", "type:<type>" or "tag:<tag id>"
+    count = models.BigIntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)  # sum of file_size
+
+    class Meta:
+        db_table = "item_counters"
+        unique_together = ("user", "key")
+
+    def __str__(self) -> str:
+        return f"{self.user} {self.key}: {self.count}"
+
+
+class SuggestionTerm(models.Model):
+    """Per-user distinct texts behind the search-as-you-type endpoint.
+
+    Maintained incrementally by apps.items.suggestions.
+    """
+
+    class Kind(models.TextChoices):
+        TITLE = "title", "Title"
+        FILE = "file", "File name"
+        TAG = "tag", "Tag"
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="suggestion_terms")
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    term = models.CharField(max_length=200)  # normalized (lowercased) text, the prefix key
+    display = models.CharField(max_length=200)  # text as the user wrote it
+    count = models.IntegerField(default=0)  # number of items (or tags) using this text
+
+    class Meta:
+        db_table = "suggestion_terms"
+        unique_together = ("user", "kind", "term")
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.display}"
+
+
+class UserDataVersion(models.Model):
+    """Per-user version of item, tag and share data.
+
+    Bumped by apps.items.versions on every mutation; ETags and cached list
+    pages are derived from it.
+    """
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="data_version")
+    version = models.BigIntegerField()
+    # Oldest version a delta-sync cursor may resume from; raised when tombstones are compacted
+    sync_floor = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "user_data_versions"
+
+    def __str__(self) -> str:
+        return f"{self.user} v{self.version}"
+
+
+class ItemTombstone(models.Model):
+    """Record of a deleted item, kept so delta sync can report the deletion.
+
+    Removed after ``SYNC_TOMBSTONE_DAYS`` by ``manage.py compact_tombstones``.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="item_tombstones")
+    item_id = models.UUIDField()
+    change_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "item_tombstones"
+        indexes = [
+            models.Index(fields=["user", "change_seq"]),
+            models.Index(fields=["deleted_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Deleted {self.item_id}"
+
+
+class Blob(models.Model):
+    """A stored file, shared by every item with the same content.
+
+    ``ref_count`` is the number of items pointing at it; unused blobs are
+    deleted by ``manage.py reclaim_files`` (see apps.items.blobs).
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "blobs"
+        indexes = [
+            models.Index(fields=["ref_count"]),
+        ]
+
+    def __str__(self) -> str:
+        return self.sha256
+
+    @staticmethod
+    def path_for(sha256: str) -> str:
+        """Path of the blob with this hash, relative to MEDIA_ROOT."""
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class Derivative(models.Model):
+    """A file generated from a stored file, such as a thumbnail; see apps.items.previews."""
+
+    source = models.CharField(max_length=64)  # blob hash, or item id for files stored before blobs
+    name = models.CharField(max_length=50)  # e.g. "thumb-256.webp"
+    size = models.BigIntegerField()
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "derivatives"
+        unique_together = [("source", "name")]
+        indexes = [
+            models.Index(fields=["used_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source}/{self.name}"
+
+    @staticmethod
+    def path_for(source: str, name: str) -> str:
+        """Path of a derivative, relative to MEDIA_ROOT."""
+        return f"derivatives/{source[:2]}/{source}/{name}"
+
+    @property
+    def path(self) -> str:
+        return self.path_for(self.source, self.name)
+
+
+class PreviewJob(models.Model):
+    """A video item waiting for its poster and metadata.
+
+    Queued when the item is created, or again when its poster is evicted,
+    and processed by ``manage.py generate_previews`` (see apps.items.videos).
+    """
+
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name="preview_job")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "preview_jobs"
+        indexes = [
+            models.Index(fields=["next_attempt_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return str(self.item_id)
+
+
+class FileReclaim(models.Model):
+    """A stored file whose item was deleted, waiting to be unlinked.
+
+    Queued in the same transaction as the delete and processed by
+    ``manage.py reclaim_files`` (see apps.items.reclaim).
+    """
+
+    file_path = models.CharField(max_length=1000)  # relative to MEDIA_ROOT
+    file_size = models.BigIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "file_reclaims"
+        indexes = [
+            models.Index(fields=["next_attempt_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return self.file_path
+
+
+class UploadSession(models.Model):
+    """A resumable upload in progress; see apps.items.uploads."""
+
+    class Status(models.TextChoices):
+        RECEIVING = "receiving", "Receiving chunks"
+        FINISHING = "finishing", "Finishing"
+        COMPLETE = "complete", "Complete"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    type = models.CharField(max_length=10, choices=ItemType.choices)
+    title = models.CharField(max_length=500, blank=True, null=True)
+    file_name = models.CharField(max_length=500)
+    file_size = models.BigIntegerField()
+    file_mimetype = models.CharField(max_length=200)
+    tag_ids = models.JSONField(default=list)
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RECEIVING)
+    sha256 = models.CharField(max_length=64, blank=True)  # expected by the client, if it said
+    item = models.ForeignKey(Item, on_delete=models.SET_NULL, blank=True, null=True, related_name="+")
+    error = models.TextField(blank=True)
+    # When a worker took the session to finish it; others wait out the lease
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "upload_sessions"
+        indexes = [
+            models.Index(fields=["expires_at"]),
+            models.Index(fields=["status"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Upload of {self.file_name}"
+
+    @property
+    def part_path(self) -> str:
+        """Path of the partial file, relative to MEDIA_ROOT."""
+        return f"uploads/{self.id}.part"
+
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.file_size // self.chunk_size)
+
+
+class UploadChunk(models.Model):
+    """A chunk of an upload session that has been written to disk."""
+
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="chunks")
+    index = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "upload_chunks"
+        unique_together = ("session", "index")
+
+
 class SharedItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="shares")
@@ -0,0 +1,141 @@
+"""
+Pagination helpers for item listings.
+
+Two modes are supported:
+
+* Page numbers (``?page=&page_size=``), the original API. Each request runs
+  a COUNT and an OFFSET scan, so cost grows with depth.
+* Keyset cursors (``?cursor=&page_size=``). The cursor is an opaque token
+  encoding the last row's position in the ``(-is_pinned, -created_at, id)``
+  ordering, which the ``items_user_keyset_idx`` index matches exactly.
+  ``is_pinned`` only has two values, so a page is read as a range within
+  the cursor's partition, ``created_at <= t`` minus the rows at ``t``
+  already seen, topped up from the unpinned partition when the pinned one
+  runs out. A multi-column OR would only match on ``user_id`` and filter
+  every earlier row. Every page costs the same regardless of depth and no
+  COUNT is run. Pass an empty ``cursor=`` to request the first page.
+
+Querysets are expected to yield ``.values()`` rows (see
+``apps.items.serialization.select``) that include the ordering columns.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any
+
+from django.db.models import Q, QuerySet, Value
+from rest_framework.request import Request
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+KEYSET_ORDERING = ("-is_pinned", "-created_at", "id")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(request: Request) -> int:
+    try:
+        page_size = int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        return DEFAULT_PAGE_SIZE
+    return page_size
+
+
+def get_page_number(request: Request) -> int:
+    try:
+        page = int(request.query_params.get("page", 1))
+    except ValueError:
+        return 1
+    return max(page, 1)
+
+
+def uses_cursor(request: Request) -> bool:
+    return "cursor" in request.query_params
+
+
+def encode_cursor(row: dict) -> str:
+    position = [row["is_pinned"], row["created_at"].isoformat(), str(row["id"])]
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[bool, datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        is_pinned, created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(created_at)
+        item_id = uuid.UUID(item_id)
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursor("Invalid pagination cursor")
+    # Cursors we issue always carry a bool and an aware timestamp
+    if not isinstance(is_pinned, bool) or created_at.tzinfo is None:
+        raise InvalidCursor("Invalid pagination cursor")
+    return is_pinned, created_at, item_id
+
+
+def paginate_by_page(items: QuerySet, request: Request, total_count: int | None = None) -> tuple[QuerySet, dict]:
+    """Slice out ``?page=``; pass ``total_count`` when it is already known to skip the COUNT."""
+    page = get_page_number(request)
+    page_size = get_page_size(request)
+
+    if total_count is None:
+        total_count = items.count()
+    total_pages = (total_count + page_size - 1) // page_size  # Ceiling division
+
+    start = (page - 1) * page_size
+    end = start + page_size
+
+    return items[start:end], {
+        "page": page,
+        "page_size": page_size,
+        "total_count": total_count,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_prev": page > 1,
+    }
+
+
+def paginate_by_cursor(items: QuerySet, request: Request) -> tuple[list[dict], dict]:
+    """Return the page after ``?cursor=`` in keyset order.
+
+    Raises ``InvalidCursor`` if the cursor cannot be decoded.
+    """
+    page_size = get_page_size(request)
+    cursor = request.query_params.get("cursor", "")
+
+    items = items.order_by(*KEYSET_ORDERING)
+    # Fetch one extra row to learn whether another page exists. is_pinned is
+    # compared through Value() so it renders as "= false", which every
+    # backend can use as an index equality ("NOT is_pinned" is not, on SQLite)
+    if cursor:
+        is_pinned, created_at, item_id = decode_cursor(cursor)
+        # The rest of the cursor's partition, one index range scan from the cursor
+        rows = list(items.filter(
+            Q(is_pinned=Value(is_pinned), created_at__lte=created_at) & ~Q(created_at=created_at, id__lte=item_id)
+        )[:page_size + 1])
+        if is_pinned and len(rows) <= page_size:
+            # Pinned items ran out; continue from the top of the unpinned ones
+            rows += list(items.filter(is_pinned=Value(False))[:page_size + 1 - len(rows)])
+    else:
+        rows = list(items[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return rows, {
+        "page_size": page_size,
+        "cursor": cursor or None,
+        "next_cursor": encode_cursor(rows[-1]) if has_next else None,
+        "has_next": has_next,
+        "has_prev": bool(cursor),
+    }
+
+
+def paginate(items: QuerySet, request: Request, total_count: int | None = None) -> tuple[Any, dict]:
+    if uses_cursor(request):
+        return paginate_by_cursor(items, request)
+    return paginate_by_page(items, request, total_count)
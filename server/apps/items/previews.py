@@ -0,0 +1,229 @@
+"""
+Thumbnails for image items.
+
+Thumbnails are generated the first time ``/api/files/<id>/thumb/?w=`` asks
+for them, at the nearest of ``THUMBNAIL_WIDTHS``. They are never wider than
+the original. JPEG sources are decoded in draft mode at the smallest
+scale that still covers the width, so a large photo is not decoded in
+full. Output is WebP when Pillow supports it, JPEG otherwise.
+
+Derivatives are stored under ``MEDIA_ROOT/derivatives`` and keyed by the
+blob hash, so duplicate uploads share them. Video posters
+(apps.items.videos) are stored the same way. Each one is recorded as a
+``Derivative`` row. ``evict``, run by ``manage.py reclaim_files``, deletes
+the least recently used ones once their total passes
+``THUMBNAIL_CACHE_BYTES``. ``used_at`` is refreshed at most once a day,
+so serving a thumbnail rarely writes to the database. Derivatives go with
+their original: ``blobs.collect`` deletes them along with an unused
+blob, and deleting an item stored before blobs queues them for reclaim
+(see ``release``).
+
+An image's pixel size is read from its header when the item is created,
+so list payloads can lay out cards before any thumbnail exists.
+``manage.py generate_previews`` fills it in for older items and can
+generate thumbnails ahead of time.
+
+Pillow is optional. Without it, sizes are unknown and thumbnail requests
+redirect to the original file.
+"""
+import functools
+import os
+import uuid
+from datetime import timedelta
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import sync
+from .models import Derivative, Item
+
+HAS_PILLOW = find_spec("PIL") is not None
+# Refresh a derivative's used_at only when it is older than this
+USED_AT_RESOLUTION = timedelta(days=1)
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def _full_path(relative_path: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def source_key(item: Item) -> str:
+    """Key that derivatives of ``item``'s file are stored under."""
+    return item.file_sha256 or item.id.hex
+
+
+@functools.cache
+def _output_format() -> tuple[str, str, str]:
+    """Return ``(Pillow format, extension, mimetype)`` for thumbnails."""
+    from PIL import features
+
+    if features.check("webp"):
+        return "WEBP", "webp", "image/webp"
+    return "JPEG", "jpg", "image/jpeg"
+
+
+def image_size(full_path: str) -> tuple[int, int] | None:
+    """Read an image's displayed size from its header, or None if it cannot be read."""
+    if not HAS_PILLOW:
+        return None
+    from PIL import Image
+
+    try:
+        with Image.open(full_path) as image:
+            width, height = image.size
+            if image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return width, height
+
+
+def record_size(item: Item) -> bool:
+    """Store the pixel size of an image item created without one.
+
+    Returns False if the image cannot be read. The item is marked changed
+    so clients that sync pick the size up.
+    """
+    size = image_size(_full_path(item.file_path))
+    if size is None:
+        return False
+    with transaction.atomic():
+        items = Item.objects.filter(pk=item.pk)
+        items.update(media_width=size[0], media_height=size[1])
+        sync.record_changed(item.user_id, items)
+    return True
+
+
+def thumbnail_width(requested: int | None) -> int:
+    """Pick the configured width closest to ``requested``, rounding up."""
+    widths = sorted(settings.THUMBNAIL_WIDTHS)
+    if requested is None:
+        return widths[0]
+    return next((width for width in widths if width >= requested), widths[-1])
+
+
+def thumbnail_name(width: int) -> str:
+    return f"thumb-{width}.{_output_format()[1]}"
+
+
+def thumbnail_mimetype() -> str:
+    return _output_format()[2]
+
+
+def _render(full_path: str, width: int, destination: str) -> tuple[int, int]:
+    from PIL import Image, ImageOps
+
+    with Image.open(full_path) as image:
+        # JPEG only: decode at 1/2, 1/4 or 1/8 scale when that still covers the
+        # width (either side may end up as the width after EXIF rotation)
+        image.draft("RGB", (width, width))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+
+        pillow_format = _output_format()[0]
+        if pillow_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        image.save(destination, pillow_format, quality=80)
+        return image.size
+
+
+def thumbnail(item: Item, width: int) -> Derivative | None:
+    """Return the thumbnail of ``item`` at ``width``, generating it if needed.
+
+    Returns None if Pillow is missing or the image cannot be decoded.
+    """
+    if not HAS_PILLOW:
+        return None
+    from PIL import Image
+
+    source, name = source_key(item), thumbnail_name(width)
+    derivative = cached(source, name)
+    if derivative:
+        return derivative
+
+    temp_path = temp_path_for(source, name)
+    try:
+        thumb_width, thumb_height = _render(_full_path(item.file_path), width, _full_path(temp_path))
+        return record(source, name, temp_path, thumb_width, thumb_height)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        if os.path.exists(_full_path(temp_path)):
+            os.remove(_full_path(temp_path))
+        return None
+
+
+def cached(source: str, name: str) -> Derivative | None:
+    """Return the derivative if it exists on disk, marking it used."""
+    derivative = Derivative.objects.filter(source=source, name=name).first()
+    if derivative is None or not os.path.exists(_full_path(derivative.path)):
+        return None
+    if derivative.used_at < timezone.now() - USED_AT_RESOLUTION:
+        Derivative.objects.filter(pk=derivative.pk).update(used_at=timezone.now())
+    return derivative
+
+
+def temp_path_for(source: str, name: str) -> str:
+    """A unique path, relative to MEDIA_ROOT, to generate a derivative at before ``record``."""
+    path = Derivative.path_for(source, name)
+    os.makedirs(os.path.dirname(_full_path(path)), exist_ok=True)
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def record(source: str, name: str, temp_path: str, width: int, height: int) -> Derivative:
+    """Move a generated file into place and record it as the derivative ``name`` of ``source``."""
+    path = Derivative.path_for(source, name)
+    # Concurrent requests may generate the same derivative; the last rename wins
+    os.replace(_full_path(temp_path), _full_path(path))
+    fields = {
+        "size": os.path.getsize(_full_path(path)),
+        "width": width,
+        "height": height,
+        "used_at": timezone.now(),
+    }
+    try:
+        with transaction.atomic():
+            derivative, _ = Derivative.objects.update_or_create(source=source, name=name, defaults=fields)
+    except IntegrityError:
+        derivative = Derivative.objects.get(source=source, name=name)
+    return derivative
+
+
+def release(sources: list[str]) -> list[tuple[str, int]]:
+    """Delete the derivative rows of ``sources``, whose originals are gone.
+
+    Returns ``(path, size)`` of their files, which the caller removes.
+    """
+    derivatives = Derivative.objects.filter(source__in=sources)
+    files = [(derivative.path, derivative.size) for derivative in derivatives.only("source", "name", "size")]
+    derivatives.delete()
+    return files
+
+
+def evict(budget: int | None = None) -> tuple[int, int]:
+    """Delete least recently used derivatives until they fit ``budget`` bytes.
+
+    Returns ``(files, bytes)`` deleted.
+    """
+    if budget is None:
+        budget = settings.THUMBNAIL_CACHE_BYTES
+    excess = (Derivative.objects.aggregate(total=Sum("size"))["total"] or 0) - budget
+    files = size = 0
+    if excess <= 0:
+        return files, size
+
+    for derivative in Derivative.objects.order_by("used_at").iterator():
+        if size >= excess:
+            break
+        Derivative.objects.filter(pk=derivative.pk).delete()
+        try:
+            os.remove(_full_path(derivative.path))
+        except FileNotFoundError:
+            pass
+        files += 1
+        size += derivative.size
+    return files, size
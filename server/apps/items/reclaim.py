@@ -0,0 +1,109 @@
+"""
+Reclamation of files that belonged to deleted items.
+
+Deleting items no longer touches the filesystem inside the request.
+``enqueue`` records each file in ``FileReclaim`` in the same transaction
+that deletes the rows, so a file is queued if and only if its item is
+gone. ``process``, run by ``manage.py reclaim_files``, unlinks queued
+files in batches. Files in the blob store are shared between items and
+are deleted by ``blobs.collect`` once unused.
+
+A file that is already missing counts as reclaimed, so a worker that
+crashes between unlinking and committing simply finishes the job on its
+next pass. Other errors are retried with exponential backoff, up to
+``FILE_RECLAIM_MAX_ATTEMPTS`` times. Rows that run out of attempts stay in
+the table with their last error for an administrator to look at.
+"""
+import os
+from collections.abc import Iterable
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import blobs, previews
+from .models import FileReclaim
+
+MAX_BACKOFF = timedelta(hours=6)
+
+
+def enqueue_paths(files: Iterable[tuple[str, int | None]]) -> tuple[int, int]:
+    """Queue ``(file_path, file_size)`` pairs for deletion; returns ``(files, bytes)`` queued."""
+    reclaims = FileReclaim.objects.bulk_create([
+        FileReclaim(file_path=file_path, file_size=file_size or 0) for file_path, file_size in files
+    ])
+    return len(reclaims), sum(reclaim.file_size for reclaim in reclaims)
+
+
+def enqueue(items: QuerySet) -> tuple[int, int]:
+    """Queue the files of ``items`` for deletion; call in the transaction that deletes them.
+
+    Files in the blob store are released instead, and count as queued once
+    no item uses them. Returns ``(files, bytes)`` queued.
+    """
+    blob_files, blob_bytes = blobs.release(items)
+    legacy = items.filter(file_sha256="").exclude(file_path="")
+    files, size = enqueue_paths(legacy.values_list("file_path", "file_size"))
+    # Thumbnails of files stored before blobs are keyed by item id
+    enqueue_paths(previews.release([item_id.hex for item_id in legacy.values_list("id", flat=True)]))
+    return files + blob_files, size + blob_bytes
+
+
+def pending() -> dict:
+    """Totals for queued files, including those that ran out of attempts."""
+    return FileReclaim.objects.aggregate(
+        files=Count("id"),
+        bytes=Coalesce(Sum("file_size"), 0),
+    )
+
+
+def _unlink(file_path: str) -> None:
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    full_path = os.path.realpath(os.path.join(media_root, file_path))
+    if os.path.commonpath([media_root, full_path]) != media_root:
+        raise ValueError(f"{file_path} is outside MEDIA_ROOT")
+    try:
+        os.remove(full_path)
+    except FileNotFoundError:
+        pass
+
+
+def _backoff(attempts: int) -> timedelta:
+    return min(timedelta(minutes=2 ** attempts), MAX_BACKOFF)
+
+
+def process(batch_size: int = 500) -> tuple[int, int, int]:
+    """Unlink one batch of due files.
+
+    Returns ``(files reclaimed, bytes reclaimed, failures)``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Concurrent workers each claim different rows
+        batch = list(
+            FileReclaim.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, attempts__lt=settings.FILE_RECLAIM_MAX_ATTEMPTS)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+
+        done, failed = [], []
+        for reclaim in batch:
+            try:
+                _unlink(reclaim.file_path)
+            except (OSError, ValueError) as e:
+                failed.append((reclaim, str(e)))
+            else:
+                done.append(reclaim)
+
+        FileReclaim.objects.filter(id__in=[reclaim.id for reclaim in done]).delete()
+        for reclaim, error in failed:
+            FileReclaim.objects.filter(id=reclaim.id).update(
+                attempts=F("attempts") + 1,
+                last_error=error,
+                next_attempt_at=now + _backoff(reclaim.attempts + 1),
+            )
+
+    return len(done), sum(reclaim.file_size for reclaim in done), len(failed)
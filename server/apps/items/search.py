@@ -0,0 +1,248 @@
+"""
+Item search backends.
+
+On PostgreSQL, search uses the ``items.search_vector`` column, which a
+database trigger keeps current (see migration 0008). Results are ranked
+with ``SearchRank``. Stemming cannot match filename fragments such as
+"IMG_44", so title and file_name are also matched as substrings. Those
+matches use the pg_trgm GIN indexes from migration 0011, and the same
+indexes provide "did you mean" suggestions when nothing matches.
+
+On SQLite, search uses the ``items_fts`` FTS5 table from migration 0016,
+which triggers keep in sync with items and their tag names. Each word of
+the query is matched as a prefix after Porter stemming, so "IMG_44" finds
+"IMG_4412.jpg". Results are ranked with bm25. SQLite builds without FTS5,
+and other databases, fall back to ``icontains`` matching.
+
+``snippets`` builds short highlighted excerpts of note content in the
+database, with ``ts_headline`` on PostgreSQL and FTS5 ``snippet()`` on
+SQLite. Search results can then leave out the full note.
+"""
+import functools
+import re
+import uuid
+from collections.abc import Iterable
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection, connections
+from django.db.models import BooleanField, F, FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
+
+SEARCH_CONFIG = "english"
+
+# Approximate length of a snippet in words
+SNIPPET_WORDS = 32
+SNIPPET_FRAGMENT_DELIMITER = " … "
+# Private-use characters that mark highlighted terms until the snippet is split
+HIGHLIGHT_START = "\ue000"
+HIGHLIGHT_END = "\ue001"
+
+_FTS_MATCH_SQL = "SELECT item_id FROM items_fts WHERE items_fts MATCH %s"
+_FTS_ROW_SQL = 'rowid = (SELECT fts_rowid FROM items_fts_map WHERE item_id = "items"."id")'
+# The hidden rank column applies the bm25 weights configured in migration 0016
+_FTS_RANK_SQL = f"SELECT -rank FROM items_fts WHERE items_fts MATCH %s AND {_FTS_ROW_SQL}"
+_FTS_NAME_MATCH_SQL = f"EXISTS (SELECT 1 FROM items_fts WHERE items_fts MATCH %s AND {_FTS_ROW_SQL})"
+# Column 3 is content; see migration 0016
+_FTS_SNIPPET_SQL = (
+    "SELECT item_id, snippet(items_fts, 3, %s, %s, %s, %s) FROM items_fts "
+    "WHERE items_fts MATCH %s AND rowid IN (SELECT fts_rowid FROM items_fts_map WHERE item_id IN ({}))"
+)
+
+
+def uses_postgres_search() -> bool:
+    return connection.vendor == "postgresql"
+
+
+@functools.cache
+def _has_fts_table(alias: str) -> bool:
+    # Migration 0016 skips the table on SQLite builds without FTS5
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'")
+        return cursor.fetchone() is not None
+
+
+def uses_sqlite_fts() -> bool:
+    return connection.vendor == "sqlite" and _has_fts_table(connection.alias)
+
+
+def build_fts_query(query: str) -> str | None:
+    """Turn user input into an FTS5 query that ANDs each word as a quoted prefix.
+
+    Returns None if the input has no searchable characters.
+    """
+    terms = ['"{}"*'.format(word.replace('"', '""')) for word in query.split() if re.search(r"\w", word)]
+    return " ".join(terms) or None
+
+
+def search_vector_expression() -> SearchVector:
+    """Build the expression stored in ``Item.search_vector``.
+
+    Must stay in sync with the trigger function in migration 0008.
+    """
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("file_name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("content", weight="B", config=SEARCH_CONFIG)
+    )
+
+
+def build_search_query(query: str) -> SearchQuery:
+    return SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+
+
+def _similarity(field: str, query: str):
+    return Coalesce(TrigramSimilarity(field, query), Value(0.0))
+
+
+def _postgres_match(query: str) -> Q:
+    return (
+        Q(search_vector=build_search_query(query)) |
+        Q(title__trigram_contains=query) |
+        Q(file_name__trigram_contains=query)
+    )
+
+
+def _fts_match(fts_query: str) -> Q:
+    return Q(id__in=RawSQL(_FTS_MATCH_SQL, [fts_query]))
+
+
+def filter_items(items: QuerySet, query: str) -> QuerySet:
+    """Restrict ``items`` to rows matching ``query``, keeping their ordering."""
+    if uses_postgres_search():
+        return items.filter(_postgres_match(query))
+
+    fts_query = build_fts_query(query) if uses_sqlite_fts() else None
+    if fts_query:
+        return items.filter(_fts_match(fts_query))
+
+    return items.filter(
+        Q(title__icontains=query) |
+        Q(file_name__icontains=query) |
+        Q(content__icontains=query)
+    )
+
+
+def rank_items(items: QuerySet, query: str) -> QuerySet:
+    """Filter ``items`` by ``query`` and order them by relevance.
+
+    On SQLite, bm25 normalizes by the length of the whole row, so a long
+    note whose title matches would rank below a short note that mentions
+    the term once. Title and file name matches are therefore ranked first.
+
+    Without PostgreSQL or FTS5 there is no relevance score, so the model's
+    default ordering is kept.
+    """
+    fts_query = build_fts_query(query) if uses_sqlite_fts() else None
+    if fts_query:
+        return (
+            items.filter(_fts_match(fts_query))
+            .annotate(
+                name_match=RawSQL(_FTS_NAME_MATCH_SQL, [f"{{title file_name}} : ({fts_query})"], output_field=BooleanField()),
+                rank=RawSQL(_FTS_RANK_SQL, [fts_query], output_field=FloatField()),
+            )
+            .order_by("-name_match", "-rank", "-created_at")
+        )
+
+    if not uses_postgres_search():
+        return filter_items(items, query)
+
+    text_rank = Coalesce(SearchRank(F("search_vector"), build_search_query(query)), Value(0.0))
+    name_rank = Greatest(_similarity("title", query), _similarity("file_name", query))
+    return (
+        items.filter(_postgres_match(query))
+        .annotate(rank=text_rank + name_rank)
+        .order_by("-rank", "-created_at")
+    )
+
+
+def did_you_mean(items: QuerySet, query: str, limit: int = 5) -> list[str]:
+    """Suggest titles or file names that are similar to ``query``.
+
+    Uses the pg_trgm ``%`` operator, so it only returns suggestions on
+    PostgreSQL.
+    """
+    if not uses_postgres_search():
+        return []
+
+    candidates = (
+        items.filter(Q(title__trigram_similar=query) | Q(file_name__trigram_similar=query))
+        .annotate(
+            title_similarity=_similarity("title", query),
+            file_name_similarity=_similarity("file_name", query),
+        )
+        .annotate(similarity=Greatest("title_similarity", "file_name_similarity"))
+        .order_by("-similarity")
+        .values_list("title", "file_name", "title_similarity", "file_name_similarity")[:limit * 2]
+    )
+
+    suggestions = []
+    for title, file_name, title_similarity, file_name_similarity in candidates:
+        suggestion = title if title and title_similarity >= file_name_similarity else file_name
+        if suggestion and suggestion not in suggestions:
+            suggestions.append(suggestion)
+    return suggestions[:limit]
+
+
+def split_highlights(text: str) -> list[str]:
+    """Split a marked-up snippet into alternating plain and highlighted parts.
+
+    Even indexes hold plain text and odd indexes hold matched terms, so
+    clients can render highlights without parsing markup.
+    """
+    parts = [""]
+    for piece in re.split(f"({HIGHLIGHT_START}|{HIGHLIGHT_END})", text):
+        if piece == HIGHLIGHT_START:
+            if len(parts) % 2:
+                parts.append("")
+        elif piece == HIGHLIGHT_END:
+            if not len(parts) % 2:
+                parts.append("")
+        else:
+            parts[-1] += piece
+    if len(parts) > 1 and not parts[-1]:
+        parts.pop()
+    return parts
+
+
+def _postgres_snippets(items: QuerySet, query: str) -> Iterable[tuple]:
+    return items.annotate(
+        headline=SearchHeadline(
+            "content",
+            build_search_query(query),
+            config=SEARCH_CONFIG,
+            start_sel=HIGHLIGHT_START,
+            stop_sel=HIGHLIGHT_END,
+            max_words=SNIPPET_WORDS,
+            min_words=SNIPPET_WORDS // 2,
+            max_fragments=2,
+            fragment_delimiter=SNIPPET_FRAGMENT_DELIMITER,
+        )
+    ).values_list("id", "headline")
+
+
+def _fts_snippets(item_ids: list, fts_query: str) -> Iterable[tuple]:
+    item_ids = [uuid.UUID(str(item_id)).hex for item_id in item_ids]
+    sql = _FTS_SNIPPET_SQL.format(", ".join(["%s"] * len(item_ids)))
+    params = [HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_FRAGMENT_DELIMITER.strip(), SNIPPET_WORDS, fts_query, *item_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(uuid.UUID(item_id), snippet) for item_id, snippet in cursor.fetchall()]
+
+
+def snippets(items: QuerySet, query: str) -> dict:
+    """Map the ids of ``items`` to highlighted excerpts of their content.
+
+    Each excerpt is a list as returned by ``split_highlights``. Only meant
+    for a page of results, since every excerpt is built from the full
+    content. Returns an empty dict where the database cannot build them.
+    """
+    if uses_postgres_search():
+        rows = _postgres_snippets(items, query)
+    else:
+        fts_query = build_fts_query(query) if uses_sqlite_fts() else None
+        item_ids = list(items.values_list("id", flat=True)) if fts_query else []
+        if not item_ids:
+            return {}
+        rows = _fts_snippets(item_ids, fts_query)
+    return {item_id: split_highlights(snippet) for item_id, snippet in rows if snippet}
@@ -0,0 +1,161 @@
+"""
+Item serialization shared by the item views.
+
+``select`` turns an item queryset into ``.values()`` rows that hold only
+the columns the requested fields need. ``serialize`` turns those rows into
+response dicts. Tags for a whole page come from a single query on
+``item_tags`` and are mapped back to items by id. Each tag dict is built
+once and shared by every item carrying that tag. No model instances are
+created.
+
+Fields are named as in the item list's ``?fields=`` parameter, plus
+``file``, which nests a file's name, size, type and URL the way the detail
+and shared views return them. ``thumbnail`` gives image items, and video
+items once processed, the URL of their thumbnail or poster and the
+original's pixel size, so cards can be laid out before it loads.
+``video`` adds a video's length and codec (see apps.items.previews and
+apps.items.videos). Output keys always follow ``FIELD_ORDER``.
+``manage.py benchmark_serialization`` compares this with building dicts
+from model instances.
+"""
+import json
+from collections import defaultdict
+from collections.abc import Collection, Iterable
+
+from django.db.models import Case, F, QuerySet, TextField, When
+from django.db.models.functions import Length, Substr
+
+from .models import ItemTag, ItemType
+
+FIELD_ORDER = (
+    "id", "type", "title", "file_name", "file_size", "file_mimetype",
+    "is_pinned", "created_at", "updated_at", "tags", "content", "thumbnail", "video", "file",
+)
+
+# Field sets returned by each view
+LIST_FIELDS = FIELD_ORDER[:-1]
+SEARCH_FIELDS = ("id", "type", "title", "file_name", "is_pinned", "created_at", "tags", "content", "thumbnail", "video")
+DETAIL_FIELDS = (
+    "id", "type", "title", "is_pinned", "created_at", "updated_at", "tags", "content", "thumbnail", "video", "file",
+)
+SHARED_FIELDS = ("id", "type", "title", "created_at", "tags", "content", "file")
+
+# Fields copied from the row unchanged, in output order. UUIDs and
+# datetimes are left to the renderer (see apps.core.renderers).
+_PLAIN_FIELDS = ("type", "title", "file_name", "file_size", "file_mimetype", "is_pinned", "created_at", "updated_at")
+_FILE_COLUMNS = ("file_path", "file_name", "file_size", "file_mimetype")
+_CONTENT_TYPES = (ItemType.TEXT, ItemType.LOGIN)
+
+
+def select(items: QuerySet, fields: Collection[str], snippet_length: int | None = None) -> QuerySet:
+    """Return ``items`` as ``.values()`` rows carrying what ``serialize`` needs for ``fields``.
+
+    With ``snippet_length``, text content is cut in the database so the
+    full note never leaves it.
+    """
+    # The ordering columns are always needed for pagination cursors
+    columns = ["id", "type", "is_pinned", "created_at"]
+    columns += [f for f in ("title", "file_name", "file_size", "file_mimetype", "updated_at") if f in fields]
+    if "content" in fields:
+        if snippet_length:
+            # Login content is JSON and small, so it is never cut
+            items = items.annotate(
+                content_preview=Case(
+                    When(type=ItemType.LOGIN, then=F("content")),
+                    default=Substr("content", 1, snippet_length),
+                    output_field=TextField(),
+                ),
+                content_length=Length("content"),
+            )
+            columns += ["content_preview", "content_length"]
+        else:
+            columns.append("content")
+    if "thumbnail" in fields:
+        columns += ["media_width", "media_height"]
+    if "thumbnail" in fields or "video" in fields:
+        columns += ["media_codec"]
+    if "video" in fields:
+        columns += ["media_duration"]
+    if "file" in fields:
+        columns += [c for c in _FILE_COLUMNS if c not in columns]
+    return items.values(*columns)
+
+
+def tags_by_item(item_ids: Iterable) -> dict:
+    """Map each item id to its tags with one query."""
+    tags = {}
+    by_item = defaultdict(list)
+    rows = (
+        ItemTag.objects.filter(item_id__in=item_ids)
+        .order_by("id")
+        .values_list("item_id", "tag_id", "tag__name", "tag__color")
+    )
+    for item_id, tag_id, name, color in rows:
+        tag = tags.get(tag_id)
+        if tag is None:
+            tag = tags[tag_id] = {"id": tag_id, "name": name, "color": color}
+        by_item[item_id].append(tag)
+    return by_item
+
+
+def serialize(rows: list[dict], fields: Collection[str], snippet_length: int | None = None) -> list[dict]:
+    """Build response dicts for rows produced by ``select`` with the same arguments."""
+    plain = [f for f in _PLAIN_FIELDS if f in fields]
+    with_content = "content" in fields
+    with_thumbnail = "thumbnail" in fields
+    with_video = "video" in fields
+    with_file = "file" in fields
+    tags = tags_by_item([row["id"] for row in rows]) if "tags" in fields else None
+
+    result = []
+    for row in rows:
+        item_id = row["id"]
+        data = {"id": item_id}
+        for field in plain:
+            data[field] = row[field]
+        if tags is not None:
+            data["tags"] = tags.get(item_id, [])
+
+        # Include content for text and login items
+        if with_content:
+            item_type = row["type"]
+            content = row["content_preview"] if snippet_length else row["content"]
+            if content and item_type in _CONTENT_TYPES:
+                if item_type == ItemType.LOGIN:
+                    data["content"] = json.loads(content)
+                else:
+                    data["content"] = content
+                    if snippet_length:
+                        data["content_truncated"] = row["content_length"] > snippet_length
+
+        # Videos have a poster once apps.items.videos has processed them
+        processed_video = (
+            (with_thumbnail or with_video) and row["type"] == ItemType.VIDEO and row["media_codec"] is not None
+        )
+        if with_thumbnail:
+            data["thumbnail"] = {
+                "url": f"/api/files/{item_id}/thumb/",
+                "width": row["media_width"],
+                "height": row["media_height"],
+            } if row["type"] == ItemType.IMAGE or processed_video else None
+        if with_video:
+            data["video"] = {
+                "duration": row["media_duration"],
+                "codec": row["media_codec"],
+            } if processed_video else None
+
+        if with_file and row["file_path"]:
+            data["file"] = {
+                "name": row["file_name"],
+                "size": row["file_size"],
+                "mimetype": row["file_mimetype"],
+                "url": f"/api/files/{item_id}/serve/",
+            }
+        result.append(data)
+    return result
+
+
+def serialize_one(items: QuerySet, fields: Collection[str]) -> dict | None:
+    """Serialize the single item in ``items``, or return None if there is none."""
+    rows = serialize(list(select(items, fields)[:1]), fields)
+    return rows[0] if rows else None
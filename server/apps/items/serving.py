@@ -0,0 +1,256 @@
+"""
+File responses with HTTP range support.
+
+``serve`` answers a request for a stored file with the whole file, one
+byte range, or several ranges as ``multipart/byteranges``.
+
+A single range is served from the open file, positioned at the range start
+and wrapped so that reads stop at its end. ``FileResponse`` hands the file
+to the WSGI server's ``wsgi.file_wrapper``. gunicorn then sends exactly
+Content-Length bytes from the current offset with ``os.sendfile``, so
+neither whole files nor ranges are copied through Python. Servers without
+a file wrapper, such as runserver, read the file in blocks instead.
+
+The Range header is ignored, and the whole file sent, when:
+
+* the header is malformed
+* If-Range names another version of the file
+* the request asks for more than ``MAX_RANGES`` pieces after overlapping
+  ones are merged
+
+If no range overlaps the file, the answer is 416.
+
+With ``FILE_SERVE_MODE`` set to ``x-accel-redirect`` or ``x-sendfile``,
+the worker only names the file in a header and the front-end server sends
+it, ranges included. The view has checked access by then.
+
+Stored files are never modified in place, so the caller's validators
+describe the content for as long as the URL exists. Conditional requests
+are answered with 304 before the file is opened, and browsers may keep
+files for a year (``CACHE_CONTROL``).
+"""
+import json
+import os
+import re
+import uuid
+from collections.abc import Iterator
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from .caching import etag_matches
+
+MAX_RANGES = 16
+# Per user, so private; a file's content never changes under its ETag
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Bytes read at a time when the server cannot use sendfile
+BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^\s*([0-9]*)\s*-\s*([0-9]*)\s*$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_ranges(header: str, size: int) -> list[tuple[int, int]] | None:
+    """Parse a Range header into sorted, merged, inclusive ``(start, end)`` pairs.
+
+    Returns None if the header should be ignored. Raises
+    ``RangeNotSatisfiable`` if it is valid but no range overlaps the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        match = _RANGE_RE.match(part)
+        if not match or not any(match.groups()):
+            return None
+        first, last = match.groups()
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length and size:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        previous_start, previous_end = merged[-1]
+        if start <= previous_end + 1:
+            merged[-1] = (previous_start, max(previous_end, end))
+        else:
+            merged.append((start, end))
+    return merged if len(merged) <= MAX_RANGES else None
+
+
+def _if_range_matches(request: HttpRequest, etag: str, last_modified: int) -> bool:
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        # Strong comparison; weak tags never match
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+class _FileRange:
+    """Reads at most ``length`` bytes of ``file`` from its current position."""
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        # Lets the WSGI server sendfile from the current offset
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _MultipartRanges:
+    """The body of a multipart/byteranges response."""
+
+    def __init__(self, file, ranges: list[tuple[int, int]], size: int, content_type: str):
+        self.file = file
+        self.ranges = ranges
+        self.boundary = uuid.uuid4().hex
+        self.headers = [
+            f"--{self.boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n".encode()
+            for start, end in ranges
+        ]
+        self.trailer = f"\r\n--{self.boundary}--\r\n".encode()
+
+    @property
+    def length(self) -> int:
+        return (
+            sum(len(header) for header in self.headers)
+            + sum(end - start + 1 for start, end in self.ranges)
+            + 2 * (len(self.ranges) - 1)
+            + len(self.trailer)
+        )
+
+    def __iter__(self) -> Iterator[bytes]:
+        for i, (header, (start, end)) in enumerate(zip(self.headers, self.ranges)):
+            yield b"\r\n" + header if i else header
+            self.file.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                data = self.file.read(min(BLOCK_SIZE, remaining))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+        yield self.trailer
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def not_modified(request: HttpRequest, etag: str, last_modified: int) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when there is none."""
+    if request.META.get("HTTP_IF_NONE_MATCH"):
+        return etag_matches(request, etag)
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return since is not None and last_modified <= since
+
+
+def _offload(full_path: str, content_type: str) -> HttpResponse:
+    if not os.path.exists(full_path):
+        raise FileNotFoundError(full_path)
+    response = HttpResponse(content_type=content_type)
+    if settings.FILE_SERVE_MODE == "x-accel-redirect":
+        relative_path = os.path.relpath(full_path, settings.MEDIA_ROOT)
+        response["X-Accel-Redirect"] = settings.FILE_SERVE_ACCEL_PREFIX + quote(relative_path)
+    else:
+        response["X-Sendfile"] = full_path
+    return response
+
+
+def _send(request: HttpRequest, full_path: str, content_type: str, etag: str,
+          last_modified: int) -> StreamingHttpResponse | HttpResponse:
+    file = open(full_path, "rb")
+    try:
+        size = os.fstat(file.fileno()).st_size
+
+        ranges = None
+        range_header = request.META.get("HTTP_RANGE")
+        if range_header and _if_range_matches(request, etag, last_modified):
+            try:
+                ranges = parse_ranges(range_header, size)
+            except RangeNotSatisfiable:
+                file.close()
+                response = HttpResponse(
+                    json.dumps({"error": {"code": "RANGE_NOT_SATISFIABLE", "message": f"The file is {size} bytes"}}),
+                    status=416,
+                    content_type="application/json",
+                )
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if ranges is None:
+            response = FileResponse(file, content_type=content_type)
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            file.seek(start)
+            response = FileResponse(_FileRange(file, end - start + 1), content_type=content_type, status=206)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        else:
+            body = _MultipartRanges(file, ranges, size, content_type)
+            response = StreamingHttpResponse(
+                body, content_type=f"multipart/byteranges; boundary={body.boundary}", status=206
+            )
+            response["Content-Length"] = str(body.length)
+    except BaseException:
+        file.close()
+        raise
+
+    response.block_size = BLOCK_SIZE
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def serve(request: HttpRequest, file_path: str, content_type: str, etag: str,
+          last_modified: int) -> StreamingHttpResponse | HttpResponse:
+    """Respond with the file at ``file_path``, relative to MEDIA_ROOT.
+
+    ``etag`` and ``last_modified`` (a timestamp) must identify the file's
+    content for good: conditional requests are answered with 304 before the
+    file is touched, and responses may be cached for a year. Raises
+    FileNotFoundError if the file is missing.
+    """
+    if not_modified(request, etag, last_modified):
+        response = HttpResponse(status=304)
+    elif settings.FILE_SERVE_MODE in ("x-accel-redirect", "x-sendfile"):
+        response = _offload(os.path.join(settings.MEDIA_ROOT, file_path), content_type)
+    else:
+        response = _send(request, os.path.join(settings.MEDIA_ROOT, file_path), content_type, etag, last_modified)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = CACHE_CONTROL
+    return response
@@ -0,0 +1,254 @@
+"""
+Search-as-you-type suggestions.
+
+Each user's titles, file names and tag names are stored once per distinct
+text in ``SuggestionTerm``, with how many items or tags use it. Item and
+tag writes keep it up to date incrementally through the ``record_*``
+functions. It can be rebuilt with ``manage.py rebuild_suggestions``.
+
+Lookups never query by prefix. Each worker process loads a user's whole
+term list once into an LRU cache, kept sorted, and answers prefix queries
+with a binary search; the table only needs its unique (user, kind, term)
+index. A write updates the cache of the worker that handled it once the
+transaction commits, so a rollback leaves the cache alone. Other workers
+pick the change up when their entry expires after ``SUGGEST_CACHE_TTL``
+seconds.
+"""
+import bisect
+import functools
+import heapq
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet
+
+from .models import Item, SuggestionTerm, Tag
+
+MAX_TERM_LENGTH = 200
+# Keeps term__in lookups under SQLite's limit on query parameters
+_LOOKUP_BATCH_SIZE = 1000
+
+Kind = SuggestionTerm.Kind
+
+
+def normalize(text: str | None) -> str:
+    return (text or "").strip().lower()[:MAX_TERM_LENGTH]
+
+
+class _TermList:
+    """Sorted ``(term, kind, display, count)`` rows for one user."""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows)
+        self.loaded_at = time.monotonic()
+
+    def match(self, prefix: str, limit: int) -> list[tuple]:
+        start = bisect.bisect_left(self.rows, (prefix,))
+        matches = []
+        for row in self.rows[start:]:
+            if not row[0].startswith(prefix):
+                break
+            matches.append(row)
+        return heapq.nsmallest(limit, matches, key=lambda row: (-row[3], row[0]))
+
+    def adjust(self, term: str, kind: str, display: str, delta: int) -> None:
+        index = bisect.bisect_left(self.rows, (term, kind))
+        if index < len(self.rows) and self.rows[index][:2] == (term, kind):
+            count = self.rows[index][3] + delta
+            if count > 0:
+                self.rows[index] = (term, kind, display, count)
+            else:
+                del self.rows[index]
+        elif delta > 0:
+            self.rows.insert(index, (term, kind, display, delta))
+
+
+class _LRUCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def peek(self, key):
+        """Return the entry for ``key`` without refreshing or expiring it."""
+        with self._lock:
+            return self._entries.get(key)
+
+
+_cache = _LRUCache(maxsize=settings.SUGGEST_CACHE_USERS, ttl=settings.SUGGEST_CACHE_TTL)
+
+
+def _load(user_id) -> _TermList:
+    term_list = _cache.get(user_id)
+    if term_list is None:
+        rows = SuggestionTerm.objects.filter(user_id=user_id).values_list("term", "kind", "display", "count")
+        term_list = _TermList(rows)
+        _cache.set(user_id, term_list)
+    return term_list
+
+
+def suggest(user_id, query: str, limit: int = 8) -> list[dict]:
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    return [
+        {"text": display, "kind": kind, "count": count}
+        for _, kind, display, count in _load(user_id).match(prefix, limit)
+    ]
+
+
+def _stored_terms(user_id, keys) -> set[tuple[str, str]]:
+    """Return which ``(kind, term)`` pairs in ``keys`` already have a row."""
+    stored = set()
+    for kind in {kind for kind, _ in keys}:
+        terms = [term for key_kind, term in keys if key_kind == kind]
+        for start in range(0, len(terms), _LOOKUP_BATCH_SIZE):
+            stored.update(
+                (kind, term)
+                for term in SuggestionTerm.objects.filter(
+                    user_id=user_id, kind=kind, term__in=terms[start:start + _LOOKUP_BATCH_SIZE]
+                ).values_list("term", flat=True)
+            )
+    return stored
+
+
+def _update_cache(user_id, cached: _TermList | None, changes: dict[tuple[str, str], list]) -> None:
+    """Apply committed ``changes`` to the term list that was cached before they were written."""
+    current = _cache.peek(user_id)
+    if current is None:
+        return
+    if current is not cached:
+        # Loaded while the transaction was open, so it may predate the changes
+        _cache.discard(user_id)
+        return
+    for (kind, term), (display, delta) in changes.items():
+        current.adjust(term, kind, display, delta)
+
+
+def _adjust(user_id, changes: dict[tuple[str, str], list]) -> None:
+    """Apply ``{(kind, term): [display, delta]}`` to the table, and to the local cache on commit."""
+    changes = {key: value for key, value in changes.items() if key[1] and value[1]}
+    if not changes:
+        return
+    transaction.on_commit(functools.partial(_update_cache, user_id, _cache.peek(user_id), changes))
+    removed = False
+
+    # Insert new terms together, since bulk item creation adds many at once
+    inserted = set()
+    stored = _stored_terms(user_id, changes)
+    new_terms = [
+        SuggestionTerm(user_id=user_id, kind=kind, term=term, display=display, count=delta)
+        for (kind, term), (display, delta) in changes.items()
+        if delta > 0 and (kind, term) not in stored
+    ]
+    if new_terms:
+        try:
+            with transaction.atomic():
+                SuggestionTerm.objects.bulk_create(new_terms)
+            inserted = {(term.kind, term.term) for term in new_terms}
+        except IntegrityError:
+            # Some were created concurrently by another request; go term by term
+            pass
+
+    for (kind, term), (display, delta) in changes.items():
+        if (kind, term) not in inserted:
+            updated = SuggestionTerm.objects.filter(user_id=user_id, kind=kind, term=term).update(
+                count=F("count") + delta, display=display
+            )
+            if not updated and delta > 0:
+                try:
+                    with transaction.atomic():
+                        SuggestionTerm.objects.create(user_id=user_id, kind=kind, term=term, display=display, count=delta)
+                except IntegrityError:
+                    # Created concurrently by another request
+                    SuggestionTerm.objects.filter(user_id=user_id, kind=kind, term=term).update(count=F("count") + delta)
+        removed = removed or delta < 0
+
+    if removed:
+        SuggestionTerm.objects.filter(user_id=user_id, count__lte=0).delete()
+
+
+def _collect(items: QuerySet, sign: int) -> dict:
+    changes = defaultdict(lambda: ["", 0])
+    for field, kind in (("title", Kind.TITLE), ("file_name", Kind.FILE)):
+        rows = items.order_by().exclude(**{f"{field}__isnull": True}).exclude(**{field: ""})
+        for row in rows.values(field).annotate(n=Count("id")):
+            entry = changes[(kind, normalize(row[field]))]
+            entry[0] = row[field].strip()[:MAX_TERM_LENGTH]
+            entry[1] += sign * row["n"]
+    return changes
+
+
+def record_items_added(user_id, items: QuerySet) -> None:
+    _adjust(user_id, _collect(items, 1))
+
+
+def record_items_removed(user_id, items: QuerySet) -> None:
+    """Drop the titles and file names of ``items``; call before deleting them."""
+    _adjust(user_id, _collect(items, -1))
+
+
+def record_title_changed(user_id, old_title: str | None, new_title: str | None) -> None:
+    if normalize(old_title) == normalize(new_title):
+        return
+    changes = {}
+    if normalize(old_title):
+        changes[(Kind.TITLE, normalize(old_title))] = [old_title.strip(), -1]
+    if normalize(new_title):
+        changes[(Kind.TITLE, normalize(new_title))] = [new_title.strip(), 1]
+    _adjust(user_id, changes)
+
+
+def record_tag_renamed(user_id, old_name: str | None, new_name: str | None) -> None:
+    """Track tag names; pass ``old_name=None`` for a new tag and ``new_name=None`` on delete."""
+    changes = {}
+    if normalize(old_name):
+        changes[(Kind.TAG, normalize(old_name))] = [old_name.strip(), -1]
+    if normalize(new_name):
+        entry = changes.setdefault((Kind.TAG, normalize(new_name)), [new_name.strip(), 0])
+        entry[0] = new_name.strip()
+        entry[1] += 1
+    _adjust(user_id, changes)
+
+
+@transaction.atomic
+def rebuild(user_id) -> None:
+    """Recompute a user's suggestion terms from their items and tags."""
+    SuggestionTerm.objects.filter(user_id=user_id).delete()
+    changes = _collect(Item.objects.filter(user_id=user_id), 1)
+    for name in Tag.objects.filter(user_id=user_id).values_list("name", flat=True):
+        entry = changes[(Kind.TAG, normalize(name))]
+        entry[0] = name.strip()
+        entry[1] += 1
+    SuggestionTerm.objects.bulk_create([
+        SuggestionTerm(user_id=user_id, kind=kind, term=term, display=display, count=count)
+        for (kind, term), (display, count) in changes.items()
+        if term and count > 0
+    ])
+    _cache.discard(user_id)
@@ -0,0 +1,104 @@
+"""
+Delta sync for clients that keep a local copy of the item list.
+
+Every item mutation stamps the changed rows with the user's new data version
+(``Item.change_seq``). Deletions leave an ``ItemTombstone`` with the same
+sequence number. ``/api/items/changes/?since=<cursor>`` returns the items and
+tombstones newer than the cursor. A client that polls it does work
+proportional to what changed, not to the size of the archive.
+
+A client syncs like this:
+
+1. Call ``/api/items/changes/`` without ``since`` to get the current cursor.
+2. Load the item list.
+3. Poll with ``since=<cursor>``, each time storing the returned cursor.
+
+Replaying a change is harmless, so anything that changed between steps 1
+and 2 is simply applied again.
+
+Tombstones are compacted after ``SYNC_TOMBSTONE_DAYS``. Compacting raises
+the user's ``sync_floor``. A cursor below the floor may have missed
+deletions, so it is rejected and the client starts over.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+
+from . import versions
+from .models import Item, ItemTombstone, UserDataVersion
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def record_changed(user_id, items: QuerySet) -> int:
+    """Bump the user's version and stamp ``items`` with it."""
+    seq = versions.bump(user_id)
+    items.update(change_seq=seq)
+    return seq
+
+
+def next_change_seq(user_id) -> int:
+    """Bump the user's version for items about to be inserted.
+
+    Set the result as their ``change_seq`` before saving them. The rows can
+    then be found again with ``change_seq=<result>`` instead of a list of ids.
+    """
+    return versions.bump(user_id)
+
+
+def record_deleted(user_id, items: QuerySet) -> int:
+    """Bump the user's version and leave tombstones for ``items``; call before deleting them."""
+    seq = versions.bump(user_id)
+    ItemTombstone.objects.bulk_create([
+        ItemTombstone(user_id=user_id, item_id=item_id, change_seq=seq)
+        for item_id in items.values_list("id", flat=True)
+    ])
+    return seq
+
+
+def changes_since(user_id, since: int, limit: int) -> tuple[QuerySet, list, int, bool]:
+    """Return ``(items, deleted_ids, cursor, has_more)`` for changes after ``since``.
+
+    A page covers up to ``limit`` changes. It is never split inside one
+    version, because a single batch operation stamps many rows with the same
+    number. A large batch can therefore make a page longer than ``limit``.
+
+    Raises ``CursorExpired`` if ``since`` is older than the user's sync floor.
+    """
+    floor = UserDataVersion.objects.filter(user_id=user_id).values_list("sync_floor", flat=True).first()
+    if floor is None or since < floor:
+        raise CursorExpired("Changes since this cursor are no longer available")
+
+    items = Item.objects.filter(user_id=user_id, change_seq__gt=since)
+    tombstones = ItemTombstone.objects.filter(user_id=user_id, change_seq__gt=since)
+
+    # Find the last version that fits in this page
+    seqs = sorted(
+        list(items.order_by("change_seq").values_list("change_seq", flat=True)[:limit + 1]) +
+        list(tombstones.order_by("change_seq").values_list("change_seq", flat=True)[:limit + 1])
+    )
+    if not seqs:
+        return Item.objects.none(), [], since, False
+    has_more = len(seqs) > limit
+    cursor = seqs[limit - 1] if has_more else seqs[-1]
+
+    items = items.filter(change_seq__lte=cursor).order_by("change_seq", "id")
+    deleted = list(tombstones.filter(change_seq__lte=cursor).order_by("change_seq").values_list("item_id", flat=True))
+    return items, deleted, cursor, has_more
+
+
+@transaction.atomic
+def compact(days: int) -> int:
+    """Delete tombstones older than ``days`` and raise the affected sync floors."""
+    expired = ItemTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days))
+    purged = expired.order_by().values("user_id").annotate(seq=Max("change_seq")).values_list("user_id", "seq")
+    for user_id, seq in purged:
+        UserDataVersion.objects.filter(user_id=user_id, sync_floor__lt=seq).update(sync_floor=seq)
+        # Cached change pages for old cursors are no longer valid
+        versions.bump(user_id)
+    deleted, _ = expired.delete()
+    return deleted
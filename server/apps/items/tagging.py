@@ -0,0 +1,59 @@
+"""
+Tag assignment for single items.
+
+``set_tags`` diffs an item's current tags against the requested ones and
+applies the difference with at most one bulk insert and one delete, so the
+number of queries does not grow with the number of tags. Requested ids
+that are malformed or belong to another user are ignored, as before.
+"""
+import uuid
+from collections.abc import Iterable
+
+from django.http import QueryDict
+
+from .models import Item, ItemTag, Tag
+
+
+def requested_tag_ids(data) -> list[str] | None:
+    """Read ``tag_ids`` from a form or JSON request body.
+
+    Forms repeat the ``tag_ids`` field, and a form without it means no tags.
+    JSON bodies send a list; None is returned when the key is missing, so
+    callers can leave tags untouched.
+    """
+    if isinstance(data, QueryDict):
+        return data.getlist("tag_ids")
+    tag_ids = data.get("tag_ids")
+    if tag_ids is None:
+        return None
+    return tag_ids if isinstance(tag_ids, list) else [tag_ids]
+
+
+def owned_tag_ids(user, tag_ids: Iterable) -> set[uuid.UUID]:
+    """Return the ids in ``tag_ids`` that name tags owned by ``user``, with one query."""
+    parsed = set()
+    for tag_id in tag_ids:
+        try:
+            parsed.add(uuid.UUID(str(tag_id)))
+        except ValueError:
+            continue
+    if not parsed:
+        return set()
+    return set(Tag.objects.filter(user=user, id__in=parsed).values_list("id", flat=True))
+
+
+def set_tags(item: Item, user, tag_ids: Iterable) -> tuple[set[uuid.UUID], set[uuid.UUID]]:
+    """Make ``item``'s tags exactly the owned tags in ``tag_ids``.
+
+    Returns ``(old tag ids, new tag ids)`` for counter bookkeeping.
+    """
+    desired = owned_tag_ids(user, tag_ids)
+    current = set(ItemTag.objects.filter(item=item).values_list("tag_id", flat=True))
+
+    removed = current - desired
+    if removed:
+        ItemTag.objects.filter(item=item, tag_id__in=removed).delete()
+    added = desired - current
+    if added:
+        ItemTag.objects.bulk_create([ItemTag(item=item, tag_id=tag_id) for tag_id in added])
+    return current, desired
@@ -0,0 +1,358 @@
+"""
+Resumable, chunked file uploads.
+
+A client creates an ``UploadSession`` with the file's name, size and type.
+The server preallocates ``MEDIA_ROOT/uploads/<session id>.part`` and
+answers with a chunk size. The client then PUTs each chunk at its byte
+offset, in any order and in parallel. Each chunk is streamed from the
+request straight into its place in the file, so worker memory does not
+grow with the file size. Every written chunk is recorded as an
+``UploadChunk`` row, and a client that lost its connection asks which
+chunks are still missing.
+
+Completing the session only checks that every chunk arrived and marks
+it finishing, so the request returns at once whatever the file's size.
+``finish``, run by ``manage.py finish_uploads``, does the rest in the
+background. It hashes the file with SHA-256 in fixed-size reads, then
+creates the item and hands the part file itself to the blob store
+(apps.items.blobs) in one transaction. Content that is already stored is
+not kept twice. The client polls the session for the result.
+
+Chunk writes hold a shared lock on the part file and re-check the status
+once they have it. ``finish`` takes the exclusive lock after marking the
+session finishing. In-flight writes therefore end before the file is
+hashed, and later ones stop without writing, so the file is private by
+the time it becomes a blob.
+
+Sessions accept files up to ``MAX_CHUNKED_UPLOAD_SIZE``, beyond the
+single-request limits, except for images. Because space is reserved up
+front, one user's unfinished sessions may together reserve at most
+``UPLOAD_RESERVED_BYTES_PER_USER``. Sessions that are not completed
+within ``UPLOAD_SESSION_HOURS`` are expired by ``manage.py reclaim_files``,
+which queues their partial files for deletion. Finished sessions are kept
+as long again, so clients can read the result.
+"""
+import errno
+import fcntl
+import os
+from collections.abc import Iterable
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from . import blobs, counters, previews, reclaim, suggestions, sync, tagging, videos
+from .models import Blob, Item, ItemType, UploadChunk, UploadSession
+
+FILE_TYPES = (ItemType.IMAGE, ItemType.VIDEO, ItemType.FILE)
+MAX_FILE_NAME_LENGTH = 255
+# How long a worker may take to finish a session before another retries it
+FINISH_LEASE = timedelta(hours=1)
+# Sessions whose part file is still on disk in its place
+_WITH_PART_FILE = (UploadSession.Status.RECEIVING, UploadSession.Status.FINISHING)
+
+
+class InvalidChunk(Exception):
+    pass
+
+
+class IncompleteUpload(Exception):
+    pass
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+class UploadQuotaExceeded(Exception):
+    pass
+
+
+class UploadFinishing(Exception):
+    pass
+
+
+def max_file_size(item_type: str) -> int:
+    if item_type == ItemType.IMAGE:
+        return settings.MAX_IMAGE_SIZE
+    if item_type == ItemType.VIDEO:
+        return settings.MAX_VIDEO_SIZE
+    return settings.MAX_FILE_SIZE
+
+
+def max_session_size(item_type: str) -> int:
+    """Largest file a resumable upload of ``item_type`` accepts."""
+    if item_type == ItemType.IMAGE:
+        return settings.MAX_IMAGE_SIZE
+    return max(max_file_size(item_type), settings.MAX_CHUNKED_UPLOAD_SIZE)
+
+
+def clean_file_name(name: str) -> str | None:
+    """Reduce a client-supplied name to a safe base name, or None if nothing is left."""
+    name = os.path.basename(str(name).replace("\\", "/")).strip()
+    if name in ("", ".", ".."):
+        return None
+    return name[-MAX_FILE_NAME_LENGTH:]
+
+
+def create_file_item(user, item_type: str, title: str | None, file_name: str, mimetype: str,
+                     tag_ids: Iterable, sha256: str, file_size: int, temp_path: str | None = None) -> Item | None:
+    """Create a file item whose content is the blob ``sha256``, with its bookkeeping.
+
+    With ``temp_path`` the content comes from that file, which is consumed
+    (see ``blobs.store``). Without it the blob must already be stored, and
+    None is returned if it is gone.
+    """
+    with transaction.atomic():
+        if temp_path is None and not blobs.add_reference(sha256):
+            return None
+
+        size = None
+        if item_type == ItemType.IMAGE:
+            size = previews.image_size(_full_path(temp_path or Blob.path_for(sha256)))
+
+        item = Item.objects.create(
+            user=user,
+            type=item_type,
+            title=title,
+            file_path=Blob.path_for(sha256),
+            file_sha256=sha256,
+            file_name=file_name,
+            file_size=file_size,
+            file_mimetype=mimetype,
+            media_width=size[0] if size else None,
+            media_height=size[1] if size else None,
+        )
+        if tag_ids:
+            tagging.set_tags(item, user, tag_ids)
+
+        counters.record_added(user.id, Item.objects.filter(pk=item.pk))
+        suggestions.record_items_added(user.id, Item.objects.filter(pk=item.pk))
+        sync.record_changed(user.id, Item.objects.filter(pk=item.pk))
+        videos.enqueue(Item.objects.filter(pk=item.pk))
+
+        if temp_path is not None:
+            blobs.store(temp_path, sha256, file_size)
+    return item
+
+
+def _full_path(relative_path: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def _preallocate(path: str, size: int) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        try:
+            # Reserve the blocks now, so a full disk fails here and not mid-upload
+            os.posix_fallocate(fd, 0, size)
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+            os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def create_session(user, item_type: str, file_name: str, file_size: int, mimetype: str,
+                   title: str | None, tag_ids: list) -> UploadSession:
+    """Start an upload.
+
+    Raises ``UploadQuotaExceeded`` if the user's unfinished uploads would
+    reserve more than ``UPLOAD_RESERVED_BYTES_PER_USER``, and OSError if
+    the file cannot be preallocated.
+    """
+    session = UploadSession(
+        user=user,
+        type=item_type,
+        title=title,
+        file_name=file_name,
+        file_size=file_size,
+        file_mimetype=mimetype,
+        tag_ids=[str(tag_id) for tag_id in tag_ids],
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_HOURS),
+    )
+    with transaction.atomic():
+        # Serializes one user's session starts, so the total is checked once per session
+        get_user_model().objects.select_for_update().filter(pk=user.pk).first()
+        reserved = UploadSession.objects.filter(user=user, status__in=_WITH_PART_FILE).aggregate(
+            total=Sum("file_size")
+        )["total"] or 0
+        if reserved + file_size > settings.UPLOAD_RESERVED_BYTES_PER_USER:
+            raise UploadQuotaExceeded(
+                f"Unfinished uploads already reserve {reserved} of "
+                f"{settings.UPLOAD_RESERVED_BYTES_PER_USER} bytes; complete or cancel some first"
+            )
+
+        os.makedirs(_full_path("uploads"), exist_ok=True)
+        _preallocate(_full_path(session.part_path), file_size)
+        try:
+            session.save()
+        except Exception:
+            os.remove(_full_path(session.part_path))
+            raise
+    return session
+
+
+def missing_chunks(session: UploadSession) -> list[int]:
+    received = set(session.chunks.values_list("index", flat=True))
+    return [index for index in range(session.chunk_count) if index not in received]
+
+
+def write_chunk(session: UploadSession, offset: int, length: int, stream) -> None:
+    """Copy ``length`` bytes from ``stream`` into the session's file at ``offset``.
+
+    Chunks must start on a chunk boundary and fill the whole chunk; only the
+    last one may be shorter. Writing the same chunk twice is harmless.
+    Raises ``UploadNotFound`` if the session stopped receiving chunks or was
+    removed meanwhile.
+    """
+    if offset < 0 or offset % session.chunk_size or offset >= session.file_size:
+        raise InvalidChunk(f"offset must be a multiple of {session.chunk_size} below {session.file_size}")
+    expected = min(session.chunk_size, session.file_size - offset)
+    if length != expected:
+        raise InvalidChunk(f"The chunk at offset {offset} must be {expected} bytes")
+
+    written = 0
+    with open(_full_path(session.part_path), "r+b") as destination:
+        fcntl.flock(destination.fileno(), fcntl.LOCK_SH)
+        # Re-checked under the lock: once finishing, the file is the worker's
+        if not UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.RECEIVING).exists():
+            raise UploadNotFound("The upload is no longer receiving chunks")
+
+        destination.seek(offset)
+        while written < length:
+            data = stream.read(min(blobs.COPY_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            destination.write(data)
+            written += len(data)
+        if written != length:
+            raise InvalidChunk(f"Received {written} of {length} bytes")
+
+        try:
+            with transaction.atomic():
+                UploadChunk.objects.bulk_create(
+                    [UploadChunk(session=session, index=offset // session.chunk_size)], ignore_conflicts=True
+                )
+        except IntegrityError:
+            raise UploadNotFound("The upload was completed, cancelled or expired")
+
+
+def complete(session_id, user, sha256: str | None = None) -> UploadSession | None:
+    """Mark a fully received session for ``finish`` to turn into an item.
+
+    Returns the session, or None if it does not exist. Asking again for a
+    session that is already finishing or finished just returns it. Raises
+    ``IncompleteUpload`` if chunks are missing.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session_id, user=user).first()
+        if session is None or session.status != UploadSession.Status.RECEIVING:
+            return session
+
+        missing = missing_chunks(session)
+        if missing:
+            raise IncompleteUpload(f"{len(missing)} chunk(s) have not been received")
+
+        session.status = UploadSession.Status.FINISHING
+        session.sha256 = (sha256 or "").lower()
+        session.expires_at = timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_HOURS)
+        session.save(update_fields=["status", "sha256", "expires_at"])
+    return session
+
+
+def _fail(session: UploadSession, error: str) -> None:
+    with transaction.atomic():
+        if UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.FINISHING).update(
+            status=UploadSession.Status.FAILED, error=error
+        ):
+            reclaim.enqueue_paths([(session.part_path, session.file_size)])
+
+
+def _finish(session: UploadSession) -> None:
+    full_path = _full_path(session.part_path)
+    with open(full_path, "rb") as part:
+        # Waits for chunk writes still in flight; later ones see the status and stop
+        fcntl.flock(part.fileno(), fcntl.LOCK_EX)
+    digest = blobs.file_sha256(full_path)
+    if session.sha256 and session.sha256 != digest:
+        _fail(session, f"The uploaded file's SHA-256 is {digest}")
+        return
+
+    with transaction.atomic():
+        # Expired or cancelled meanwhile: the part file is already queued for deletion
+        if not UploadSession.objects.select_for_update().filter(
+            pk=session.pk, status=UploadSession.Status.FINISHING
+        ).exists():
+            return
+        item = create_file_item(
+            session.user, session.type, session.title, session.file_name, session.file_mimetype,
+            session.tag_ids, digest, session.file_size, temp_path=session.part_path,
+        )
+        UploadSession.objects.filter(pk=session.pk).update(
+            status=UploadSession.Status.COMPLETE, sha256=digest, item=item,
+            expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_HOURS),
+        )
+        session.chunks.all().delete()
+
+
+def finish(batch_size: int = 10) -> tuple[int, int]:
+    """Turn one batch of finishing sessions into items; returns ``(finished, failures)``.
+
+    A session whose file cannot be read stays finishing and is retried
+    once its claim is older than ``FINISH_LEASE``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Concurrent workers each claim different sessions
+        sessions = list(
+            UploadSession.objects.select_for_update(skip_locked=True)
+            .filter(status=UploadSession.Status.FINISHING)
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - FINISH_LEASE))
+            .select_related("user")
+            .order_by("expires_at")[:batch_size]
+        )
+        UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).update(claimed_at=now)
+
+    finished = failed = 0
+    for session in sessions:
+        try:
+            _finish(session)
+        except OSError:
+            failed += 1
+        else:
+            finished += 1
+    return finished, failed
+
+
+def abort(session_id, user) -> bool:
+    """Cancel a session, or forget a finished one; returns False if it is not there.
+
+    Raises ``UploadFinishing`` while ``finish`` may be working on it.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session_id, user=user).first()
+        if session is None:
+            return False
+        if session.status == UploadSession.Status.FINISHING:
+            raise UploadFinishing("The upload is being finished")
+        if session.status == UploadSession.Status.RECEIVING:
+            reclaim.enqueue_paths([(session.part_path, session.file_size)])
+        session.delete()
+    return True
+
+
+def expire_sessions() -> int:
+    """Drop sessions past their expiry and queue partial files for deletion."""
+    with transaction.atomic():
+        expired = UploadSession.objects.filter(expires_at__lt=timezone.now())
+        reclaim.enqueue_paths(
+            (session.part_path, session.file_size) for session in expired.filter(status__in=_WITH_PART_FILE)
+        )
+        _, deleted = expired.delete()
+    return deleted.get(UploadSession._meta.label, 0)
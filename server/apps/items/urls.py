@@ -10,11 +10,20 @@ urlpatterns = [
     path("items/<uuid:pk>/shares/", views.ListSharesView.as_view(), name="item-shares"),
     path("items/<uuid:pk>/share/", views.CreateShareView.as_view(), name="item-share-create"),
     path("shares/<uuid:pk>/", views.DeleteShareView.as_view(), name="share-delete"),
+    path("items/bulk/", views.ItemBulkCreateView.as_view(), name="item-bulk-create"),
+    path("items/batch/", views.ItemBatchView.as_view(), name="item-batch"),
     path("items/batch-delete/", views.ItemBatchDeleteView.as_view(), name="item-batch-delete"),
     path("items/search/", views.ItemSearchView.as_view(), name="item-search"),
+    path("items/suggest/", views.ItemSuggestView.as_view(), name="item-suggest"),
+    path("items/changes/", views.ItemChangesView.as_view(), name="item-changes"),
+    path("items/facets/", views.ItemFacetsView.as_view(), name="item-facets"),
     path("shared/<str:identifier>/", views.ViewSharedItemView.as_view(), name="shared-item-view"),
     path("tags/", views.TagListView.as_view(), name="tag-list"),
     path("tags/<uuid:pk>/", views.TagDetailView.as_view(), name="tag-detail"),
     path("files/upload/", views.FileUploadView.as_view(), name="file-upload"),
+    path("files/uploads/", views.UploadSessionListView.as_view(), name="upload-session-list"),
+    path("files/uploads/<uuid:pk>/", views.UploadSessionDetailView.as_view(), name="upload-session-detail"),
+    path("files/uploads/<uuid:pk>/complete/", views.UploadSessionCompleteView.as_view(), name="upload-session-complete"),
     path("files/<uuid:pk>/serve/", views.FileServeView.as_view(), name="file-serve"),
+    path("files/<uuid:pk>/thumb/", views.FileThumbnailView.as_view(), name="file-thumbnail"),
 ]
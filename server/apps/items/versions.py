@@ -0,0 +1,53 @@
+"""
+Per-user data versions.
+
+Every item, tag or share mutation calls ``bump`` in the same transaction as
+the change. Readers derive ETags and response cache keys from
+``get_version``, so bumping the version is all the invalidation needed.
+
+New rows start from the current time in microseconds rather than 1. A
+version therefore never repeats, even after the table is cleared by a
+full backup restore.
+
+``bump`` holds the row lock until the transaction ends, so one user's
+versions commit in increasing order. Delta sync (``apps.items.sync``)
+relies on this to use them as its change sequence.
+"""
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import UserDataVersion
+
+
+def _initial_version() -> int:
+    return time.time_ns() // 1000
+
+
+def get_version(user_id) -> int:
+    version = UserDataVersion.objects.filter(user_id=user_id).values_list("version", flat=True).first()
+    if version is not None:
+        return version
+    try:
+        with transaction.atomic():
+            version = _initial_version()
+            # Changes from before this row existed are not tracked, so no older cursor is valid
+            return UserDataVersion.objects.create(user_id=user_id, version=version, sync_floor=version).version
+    except IntegrityError:
+        # Created concurrently by another request
+        return UserDataVersion.objects.get(user_id=user_id).version
+
+
+def bump(user_id) -> int:
+    """Advance the user's version and return the new value."""
+    rows = UserDataVersion.objects.filter(user_id=user_id)
+    if not rows.update(version=F("version") + 1):
+        get_version(user_id)
+        rows.update(version=F("version") + 1)
+    return rows.values_list("version", flat=True).get()
+
+
+def reset_all() -> None:
+    """Invalidate every user's ETags and cached pages at once."""
+    UserDataVersion.objects.all().delete()
@@ -0,0 +1,218 @@
+"""
+Poster frames and metadata for video items.
+
+Feed cards show a poster image, the video's length and its pixel size, so
+the browser does not fetch the video until it is played. These come from
+the ``ffprobe`` and ``ffmpeg`` binaries (``FFPROBE_PATH``, ``FFMPEG_PATH``).
+They run as subprocesses with a timeout, outside any transaction.
+
+Creating a video item queues a ``PreviewJob`` in the same transaction.
+``process``, run by ``manage.py generate_previews``, works through the
+queue:
+
+1. ffprobe reads the duration, codec and displayed size (rotation
+   applied) of the first video stream.
+2. ffmpeg grabs one frame, a tenth of the way in but at most
+   ``POSTER_MAX_SEEK`` seconds, scaled to the widest thumbnail width.
+3. The poster is stored as a derivative (apps.items.previews).
+4. The metadata is saved on the item. The item is marked changed, so
+   clients that sync refresh their cached lists.
+
+Each claimed job is leased for ``LEASE`` so concurrent workers skip it,
+and a worker that dies mid-job only delays it. Failures are retried with
+exponential backoff up to ``PREVIEW_MAX_ATTEMPTS`` times, after which the
+job stays in the table with its last error.
+
+A poster evicted from the derivative cache is not regenerated on the
+request path: ``poster`` queues the item again and the thumbnail
+endpoint answers 404 with a short ``Cache-Control`` until the worker has
+extracted it. Items already probed keep their metadata and only get a
+new poster.
+"""
+import json
+import os
+import shutil
+import subprocess
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+
+from . import previews, sync
+from .models import Derivative, Item, ItemType, PreviewJob
+
+POSTER_NAME = "poster.jpg"
+POSTER_MIMETYPE = "image/jpeg"
+# The poster frame is taken a tenth of the way in, but no later than this
+POSTER_MAX_SEEK = 5.0
+# Seconds ffprobe or ffmpeg may run before the attempt is abandoned
+COMMAND_TIMEOUT = 120
+# How long clients may cache the 404 for a poster that is being regenerated
+POSTER_PENDING_MAX_AGE = 30
+# How long a claimed job is hidden from other workers
+LEASE = timedelta(minutes=10)
+MAX_BACKOFF = timedelta(hours=6)
+
+
+class ProbeError(Exception):
+    pass
+
+
+def _full_path(relative_path: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def available() -> bool:
+    return bool(shutil.which(settings.FFPROBE_PATH) and shutil.which(settings.FFMPEG_PATH))
+
+
+def _run(args: list[str]) -> bytes:
+    try:
+        result = subprocess.run(args, capture_output=True, timeout=COMMAND_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise ProbeError(f"{os.path.basename(args[0])} did not finish in {COMMAND_TIMEOUT}s")
+    if result.returncode:
+        message = result.stderr.decode(errors="replace").strip()[-500:]
+        raise ProbeError(f"{os.path.basename(args[0])} exited with {result.returncode}: {message}")
+    return result.stdout
+
+
+def probe(full_path: str) -> dict:
+    """Return the ``width``, ``height``, ``duration`` and ``codec`` of a video's first video stream.
+
+    Width and height are as displayed, with any rotation applied; duration
+    is None if the container does not say.
+    """
+    output = _run([
+        settings.FFPROBE_PATH, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,width,height,duration:stream_tags=rotate"
+        ":stream_side_data=rotation:format=duration",
+        "-of", "json", full_path,
+    ])
+    info = json.loads(output)
+    streams = info.get("streams") or []
+    if not streams:
+        raise ProbeError("The file has no video stream")
+    stream = streams[0]
+
+    width, height = stream.get("width"), stream.get("height")
+    rotation = stream.get("tags", {}).get("rotate") or next(
+        (data["rotation"] for data in stream.get("side_data_list", []) if "rotation" in data), 0
+    )
+    if width and height and abs(int(float(rotation))) % 180 == 90:
+        width, height = height, width
+
+    duration = stream.get("duration") or info.get("format", {}).get("duration")
+    return {
+        "width": width,
+        "height": height,
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "codec": stream.get("codec_name", "")[:50],
+    }
+
+
+def _generate_poster(item: Item, width: int | None, height: int | None, duration: float | None) -> Derivative:
+    source = previews.source_key(item)
+    temp_path = previews.temp_path_for(source, POSTER_NAME)
+    seek = min(duration / 10, POSTER_MAX_SEEK) if duration else 0
+    max_width = max(settings.THUMBNAIL_WIDTHS)
+    try:
+        # Seeking before -i jumps to the nearest keyframe instead of decoding up to it
+        _run([
+            settings.FFMPEG_PATH, "-v", "error", "-nostdin", "-y",
+            "-ss", f"{seek:.3f}", "-i", _full_path(item.file_path),
+            "-frames:v", "1", "-vf", f"scale='min({max_width},iw)':-2",
+            "-c:v", "mjpeg", "-q:v", "4", "-f", "image2", _full_path(temp_path),
+        ])
+        if not os.path.getsize(_full_path(temp_path)):
+            raise ProbeError(f"No frame at {seek:.3f}s")
+        poster_width = min(width, max_width) if width else max_width
+        poster_height = round(height * poster_width / width) if width and height else 0
+        return previews.record(source, POSTER_NAME, temp_path, poster_width, poster_height)
+    except BaseException:
+        if os.path.exists(_full_path(temp_path)):
+            os.remove(_full_path(temp_path))
+        raise
+
+
+def poster(item: Item) -> Derivative | None:
+    """Return the poster of a video item if it is in the derivative cache.
+
+    A processed item whose poster was evicted is queued again, and None is
+    returned until the worker has extracted it.
+    """
+    derivative = previews.cached(previews.source_key(item), POSTER_NAME)
+    if derivative is None and item.media_codec is not None:
+        # A job that ran out of attempts is left alone, like any other
+        PreviewJob.objects.bulk_create([PreviewJob(item_id=item.pk)], ignore_conflicts=True)
+    return derivative
+
+
+def enqueue(items: QuerySet) -> int:
+    """Queue the video items among ``items`` that are not queued yet; returns how many were."""
+    video_ids = items.filter(type=ItemType.VIDEO).exclude(file_path="").values_list("pk", flat=True)
+    jobs = PreviewJob.objects.bulk_create(
+        [PreviewJob(item_id=item_id) for item_id in video_ids], ignore_conflicts=True
+    )
+    return len(jobs)
+
+
+def _process(item: Item) -> None:
+    if item.media_codec is not None:
+        # Queued again because its poster was evicted
+        _generate_poster(item, item.media_width, item.media_height, item.media_duration)
+        PreviewJob.objects.filter(pk=item.pk).delete()
+        return
+
+    metadata = probe(_full_path(item.file_path))
+    _generate_poster(item, metadata["width"], metadata["height"], metadata["duration"])
+    with transaction.atomic():
+        items = Item.objects.filter(pk=item.pk)
+        items.update(
+            media_width=metadata["width"],
+            media_height=metadata["height"],
+            media_duration=metadata["duration"],
+            media_codec=metadata["codec"],
+        )
+        sync.record_changed(item.user_id, items)
+        PreviewJob.objects.filter(pk=item.pk).delete()
+
+
+def _backoff(attempts: int) -> timedelta:
+    return min(timedelta(minutes=2 ** attempts), MAX_BACKOFF)
+
+
+def process(batch_size: int = 50) -> tuple[int, int]:
+    """Process one batch of due jobs; returns ``(done, failures)``."""
+    now = timezone.now()
+    with transaction.atomic():
+        # Concurrent workers each claim different rows
+        jobs = list(
+            PreviewJob.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, attempts__lt=settings.PREVIEW_MAX_ATTEMPTS)
+            .select_related("item")
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        PreviewJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            attempts=F("attempts") + 1, next_attempt_at=now + LEASE
+        )
+
+    done = failed = 0
+    for job in jobs:
+        try:
+            _process(job.item)
+        except (OSError, ValueError, ProbeError) as e:
+            PreviewJob.objects.filter(pk=job.pk).update(
+                last_error=str(e), next_attempt_at=timezone.now() + _backoff(job.attempts + 1)
+            )
+            failed += 1
+        else:
+            done += 1
+    return done, failed
+
+
+def pending() -> int:
+    """Jobs still queued, including those that ran out of attempts."""
+    return PreviewJob.objects.count()
@@ -3,8 +3,8 @@ import uuid
 import json
 from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
-from django.http import FileResponse, HttpResponse
-from django.db.models import Q
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.db import transaction
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.request import Request
@@ -14,92 +14,81 @@ from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from datetime import timedelta
-from .models import Item, ItemType, Tag, ItemTag, SharedItem
+from . import batch, blobs, bulk, counters, facets, filters, pagination, previews, reclaim, search, serialization, serving, suggestions, sync, tagging, uploads, versions, videos
+from .caching import conditional_get
+from .models import Derivative, Item, ItemType, Tag, SharedItem, UploadSession
 
 User = get_user_model()
 
 
 class ItemListView(APIView):
+    # Fields a client may ask for with ?fields=; "id" is always returned
+    LIST_FIELDS = serialization.LIST_FIELDS
+
+    @conditional_get
     def get(self, request: Request) -> Response:
-        # Build the base queryset with proper prefetching
-        items = Item.objects.filter(user=request.user).select_related("user")
+        fields_param = request.query_params.get("fields", "").strip()
+        if fields_param:
+            fields = {f.strip() for f in fields_param.split(",") if f.strip()} | {"id"}
+            unknown = fields - set(self.LIST_FIELDS)
+            if unknown:
+                return Response(
+                    {"error": {"code": "INVALID_FIELDS", "message": f"Unknown fields: {', '.join(sorted(unknown))}. Must be among: {', '.join(self.LIST_FIELDS)}"}},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        else:
+            fields = set(self.LIST_FIELDS)
+
+        snippet_length = None
+        if "snippet_length" in request.query_params:
+            try:
+                snippet_length = int(request.query_params["snippet_length"])
+            except ValueError:
+                snippet_length = 0
+            if snippet_length < 1:
+                return Response(
+                    {"error": {"code": "INVALID_SNIPPET_LENGTH", "message": "snippet_length must be a positive integer"}},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        # Build the base queryset
+        items = Item.objects.filter(user=request.user)
 
         # Apply filters before prefetching to avoid N+1 queries
         tag_ids = request.query_params.getlist("tag")
-        if tag_ids:
-            items = items.filter(item_tags__tag_id__in=tag_ids).distinct()
-
+        tag_mode = request.query_params.get("tag_mode", filters.TAG_MODE_ANY)
+        if tag_mode not in filters.TAG_MODES:
+            return Response(
+                {"error": {"code": "INVALID_TAG_MODE", "message": f"tag_mode must be one of: {', '.join(filters.TAG_MODES)}"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         item_type = request.query_params.get("type")
-        if item_type:
-            items = items.filter(type=item_type)
-
         search_query = request.query_params.get("q", "").strip()
-        if search_query:
-            items = items.filter(
-                Q(title__icontains=search_query) |
-                Q(file_name__icontains=search_query) |
-                Q(content__icontains=search_query)
-            )
-
-        # Get total count before pagination
-        total_count = items.count()
-
-        # Pagination parameters
-        page = int(request.query_params.get("page", 1))
-        page_size = int(request.query_params.get("page_size", 20))
-
-        # Validate pagination parameters
-        if page < 1:
-            page = 1
-        if page_size < 1 or page_size > 100:
-            page_size = 20  # Default and max page size
-
-        # Calculate pagination
-        start = (page - 1) * page_size
-        end = start + page_size
-        total_pages = (total_count + page_size - 1) // page_size  # Ceiling division
-
-        # Apply pagination
-        paginated_items = items[start:end]
-
-        # Prefetch item_tags with tag relationship after all filters are applied
-        paginated_items = paginated_items.prefetch_related("item_tags__tag")
-
-        items_data = []
-        for item in paginated_items:
-            # Access the prefetched item_tags (no additional query)
-            tags = [it.tag for it in item.item_tags.all()]
-            item_data = {
-                "id": str(item.id),
-                "type": item.type,
-                "title": item.title,
-                "file_name": item.file_name,
-                "file_size": item.file_size,
-                "file_mimetype": item.file_mimetype,
-                "is_pinned": item.is_pinned,
-                "created_at": item.created_at.isoformat(),
-                "updated_at": item.updated_at.isoformat(),
-                "tags": [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags],
-            }
-            # Include content for text and login items
-            if item.content and item.type in (ItemType.TEXT, ItemType.LOGIN):
-                if item.type == ItemType.LOGIN:
-                    item_data["content"] = json.loads(item.content)
-                else:
-                    item_data["content"] = item.content
-            items_data.append(item_data)
+        items = filters.apply_filters(items, tag_ids, tag_mode, item_type, search_query)
+
+        # Unfiltered and single-filter totals come from the counters table
+        total_count = None
+        counter_key = counters.key_for_filters(tag_ids, item_type, search_query)
+        if counter_key and not pagination.uses_cursor(request):
+            total_count = counters.get_count(request.user.id, counter_key)
+
+        # Only load the requested columns
+        items = serialization.select(items, fields, snippet_length)
+
+        try:
+            paginated_items, pagination_data = pagination.paginate(items, request, total_count)
+        except pagination.InvalidCursor as e:
+            return Response(
+                {"error": {"code": "INVALID_CURSOR", "message": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        items_data = serialization.serialize(list(paginated_items), fields, snippet_length)
 
         return Response({
             "data": {
                 "items": items_data,
-                "pagination": {
-                    "page": page,
-                    "page_size": page_size,
-                    "total_count": total_count,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1,
-                }
+                "pagination": pagination_data,
             }
         })
 
@@ -122,30 +111,30 @@ class ItemListView(APIView):
                     status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 )
 
-        item = Item.objects.create(
-            user=request.user,
-            type=item_type,
-            title=title,
-            content=content if item_type in (ItemType.TEXT, ItemType.LOGIN) else None,
-        )
+        with transaction.atomic():
+            item = Item.objects.create(
+                user=request.user,
+                type=item_type,
+                title=title,
+                content=content if item_type in (ItemType.TEXT, ItemType.LOGIN) else None,
+            )
+
+            tag_ids = tagging.requested_tag_ids(request.data)
+            if tag_ids:
+                tagging.set_tags(item, request.user, tag_ids)
 
-        tag_ids = request.data.getlist("tag_ids")
-        if tag_ids:
-            for tag_id in tag_ids:
-                try:
-                    tag = Tag.objects.get(id=tag_id, user=request.user)
-                    ItemTag.objects.create(item=item, tag=tag)
-                except Tag.DoesNotExist:
-                    pass
+            counters.record_added(request.user.id, Item.objects.filter(pk=item.pk))
+            suggestions.record_items_added(request.user.id, Item.objects.filter(pk=item.pk))
+            sync.record_changed(request.user.id, Item.objects.filter(pk=item.pk))
 
         return Response(
             {
                 "data": {
                     "item": {
-                        "id": str(item.id),
+                        "id": item.id,
                         "type": item.type,
                         "title": item.title,
-                        "created_at": item.created_at.isoformat(),
+                        "created_at": item.created_at,
                     }
                 }
             },
@@ -153,6 +142,45 @@ class ItemListView(APIView):
         )
 
 
+class ItemBulkCreateView(APIView):
+    """Create many text and login items in one request, all or nothing."""
+
+    def post(self, request: Request) -> Response:
+        rows = request.data if isinstance(request.data, list) else request.data.get("items")
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {"error": {"code": "NO_ITEMS", "message": "Send a non-empty JSON array of items"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(rows) > settings.MAX_BULK_ITEMS:
+            return Response(
+                {"error": {"code": "TOO_MANY_ITEMS", "message": f"At most {settings.MAX_BULK_ITEMS} items can be created per request"}},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        cleaned, errors = bulk.validate(request.user, rows)
+        if errors:
+            return Response(
+                {"error": {"code": "INVALID_ITEMS", "message": f"{len(errors)} item(s) failed validation; nothing was created", "items": errors}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        items = bulk.create(request.user, cleaned)
+
+        return Response(
+            {
+                "data": {
+                    "items": [
+                        {"id": item.id, "type": item.type, "title": item.title, "created_at": item.created_at}
+                        for item in items
+                    ],
+                    "count": len(items),
+                }
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class ItemDetailView(APIView):
     def get_object(self, pk: uuid.UUID, user):
         try:
@@ -160,40 +188,17 @@ class ItemDetailView(APIView):
         except Item.DoesNotExist:
             return None
 
+    @conditional_get
     def get(self, request: Request, pk: uuid.UUID) -> Response:
-        item = self.get_object(pk, request.user)
-        if not item:
+        data = serialization.serialize_one(
+            Item.objects.filter(pk=pk, user=request.user), serialization.DETAIL_FIELDS
+        )
+        if not data:
             return Response(
                 {"error": {"code": "NOT_FOUND", "message": "Item not found"}},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        tags = [it.tag for it in item.item_tags.all()]
-
-        data = {
-            "id": str(item.id),
-            "type": item.type,
-            "title": item.title,
-            "is_pinned": item.is_pinned,
-            "created_at": item.created_at.isoformat(),
-            "updated_at": item.updated_at.isoformat(),
-            "tags": [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags],
-        }
-
-        if item.content:
-            if item.type == ItemType.LOGIN:
-                data["content"] = json.loads(item.content)
-            else:
-                data["content"] = item.content
-
-        if item.file_path:
-            data["file"] = {
-                "name": item.file_name,
-                "size": item.file_size,
-                "mimetype": item.file_mimetype,
-                "url": f"/api/files/{item.id}/serve/",
-            }
-
         return Response({"data": {"item": data}})
 
     def put(self, request: Request, pk: uuid.UUID) -> Response:
@@ -206,8 +211,9 @@ class ItemDetailView(APIView):
 
         title = request.data.get("title", "").strip() or None
         content = request.data.get("content", "")
-        tag_ids = request.data.getlist("tag_ids")
+        tag_ids = tagging.requested_tag_ids(request.data)
 
+        old_title = item.title
         item.title = title
 
         if content:
@@ -216,19 +222,15 @@ class ItemDetailView(APIView):
             else:
                 item.content = content
 
-        # Update tags
-        if tag_ids is not None:
-            # Remove all existing tags
-            ItemTag.objects.filter(item=item).delete()
-            # Add new tags
-            for tag_id in tag_ids:
-                try:
-                    tag = Tag.objects.get(id=tag_id, user=request.user)
-                    ItemTag.objects.create(item=item, tag=tag)
-                except Tag.DoesNotExist:
-                    pass
+        with transaction.atomic():
+            # Update tags
+            if tag_ids is not None:
+                old_tag_ids, new_tag_ids = tagging.set_tags(item, request.user, tag_ids)
+                counters.record_retagged(request.user.id, item, old_tag_ids, new_tag_ids)
 
-        item.save()
+            item.save()
+            suggestions.record_title_changed(request.user.id, old_title, item.title)
+            sync.record_changed(request.user.id, Item.objects.filter(pk=item.pk))
 
         return Response({"data": {"message": "Item updated successfully"}})
 
@@ -240,25 +242,44 @@ class ItemDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        if item.file_path:
-            full_path = os.path.join(settings.MEDIA_ROOT, item.file_path)
-            if os.path.exists(full_path):
-                os.remove(full_path)
+        # The file is unlinked later by manage.py reclaim_files
+        with transaction.atomic():
+            counters.record_removed(request.user.id, Item.objects.filter(pk=item.pk))
+            suggestions.record_items_removed(request.user.id, Item.objects.filter(pk=item.pk))
+            sync.record_deleted(request.user.id, Item.objects.filter(pk=item.pk))
+            queued_files, queued_bytes = reclaim.enqueue(Item.objects.filter(pk=item.pk))
+            item.delete()
 
-        item.delete()
-
-        return Response({"data": {"message": "Item deleted successfully"}})
+        return Response({
+            "data": {
+                "message": "Item deleted successfully",
+                "queued_files": queued_files,
+                "queued_bytes": queued_bytes,
+            }
+        })
 
 
 class ItemSearchView(APIView):
+    # Text content is cut to this many characters unless ?content=full
+    PREVIEW_LENGTH = 200
+    CONTENT_MODES = ("snippet", "full")
+
     def get(self, request: Request) -> Response:
         query = request.query_params.get("q", "").strip()
+        content_mode = request.query_params.get("content", "snippet")
+        if content_mode not in self.CONTENT_MODES:
+            return Response(
+                {"error": {"code": "INVALID_CONTENT_MODE", "message": f"content must be one of: {', '.join(self.CONTENT_MODES)}"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        snippet_length = None if content_mode == "full" else self.PREVIEW_LENGTH
 
         if not query:
             return Response({
                 "data": {
                     "items": [],
                     "query": query,
+                    "did_you_mean": [],
                     "pagination": {
                         "page": 1,
                         "page_size": 20,
@@ -270,78 +291,142 @@ class ItemSearchView(APIView):
                 }
             })
 
-        items = Item.objects.filter(
-            user=request.user
-        ).filter(
-            Q(title__icontains=query) |
-            Q(file_name__icontains=query) |
-            Q(content__icontains=query)
-        ).distinct()
-
-        # Get total count before pagination
-        total_count = items.count()
-
-        # Pagination parameters
-        page = int(request.query_params.get("page", 1))
-        page_size = int(request.query_params.get("page_size", 20))
-
-        # Validate pagination parameters
-        if page < 1:
-            page = 1
-        if page_size < 1 or page_size > 100:
-            page_size = 20  # Default and max page size
-
-        # Calculate pagination
-        start = (page - 1) * page_size
-        end = start + page_size
-        total_pages = (total_count + page_size - 1) // page_size  # Ceiling division
-
-        # Apply pagination
-        paginated_items = items[start:end]
-
-        # Prefetch item_tags with tag relationship
-        paginated_items = paginated_items.prefetch_related("item_tags__tag")
-
-        items_data = []
-        for item in paginated_items:
-            tags = [it.tag for it in item.item_tags.all()]
-            item_data = {
-                "id": str(item.id),
-                "type": item.type,
-                "title": item.title,
-                "file_name": item.file_name,
-                "is_pinned": item.is_pinned,
-                "created_at": item.created_at.isoformat(),
-                "tags": [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags],
-            }
-            # Include content for text and login items
-            if item.content and item.type in (ItemType.TEXT, ItemType.LOGIN):
-                if item.type == ItemType.LOGIN:
-                    item_data["content"] = json.loads(item.content)
-                else:
-                    item_data["content"] = item.content
-            items_data.append(item_data)
+        items = search.rank_items(Item.objects.filter(user=request.user), query)
+
+        # Cursor mode pages through matches in feed order rather than by rank
+        items = serialization.select(items, serialization.SEARCH_FIELDS, snippet_length)
+        try:
+            paginated_items, pagination_data = pagination.paginate(items, request)
+        except pagination.InvalidCursor as e:
+            return Response(
+                {"error": {"code": "INVALID_CURSOR", "message": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows = list(paginated_items)
+        items_data = serialization.serialize(rows, serialization.SEARCH_FIELDS, snippet_length)
+
+        # Highlighted excerpts of the page's notes, where the database can build them
+        text_ids = [row["id"] for row in rows if row["type"] == ItemType.TEXT]
+        snippets = search.snippets(Item.objects.filter(id__in=text_ids), query) if text_ids else {}
+        for item_data in items_data:
+            if item_data["id"] in snippets:
+                item_data["snippet"] = snippets[item_data["id"]]
+
+        # Offer close titles and file names when the first page comes back empty
+        did_you_mean = []
+        if not items_data and not pagination_data["has_prev"]:
+            did_you_mean = search.did_you_mean(Item.objects.filter(user=request.user), query)
 
         return Response({
             "data": {
                 "items": items_data,
                 "query": query,
-                "pagination": {
-                    "page": page,
-                    "page_size": page_size,
-                    "total_count": total_count,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1,
+                "did_you_mean": did_you_mean,
+                "pagination": pagination_data,
+            }
+        })
+
+
+class ItemChangesView(APIView):
+    """Items created, updated or deleted since a delta-sync cursor."""
+
+    @conditional_get
+    def get(self, request: Request) -> Response:
+        since = request.query_params.get("since", "").strip()
+        if not since:
+            # Starting point for a client about to load the full list
+            return Response({
+                "data": {
+                    "items": [],
+                    "deleted": [],
+                    "cursor": str(versions.get_version(request.user.id)),
+                    "has_more": False,
                 }
+            })
+
+        try:
+            since = int(since)
+        except ValueError:
+            return Response(
+                {"error": {"code": "INVALID_CURSOR", "message": "Invalid sync cursor"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            items, deleted, cursor, has_more = sync.changes_since(
+                request.user.id, since, pagination.get_page_size(request)
+            )
+        except sync.CursorExpired as e:
+            return Response(
+                {"error": {"code": "CURSOR_EXPIRED", "message": f"{e}; reload the item list and sync again without since"}},
+                status=status.HTTP_410_GONE,
+            )
+
+        items_data = serialization.serialize(
+            list(serialization.select(items, serialization.LIST_FIELDS)), serialization.LIST_FIELDS
+        )
+
+        return Response({
+            "data": {
+                "items": items_data,
+                "deleted": deleted,
+                "cursor": str(cursor),
+                "has_more": has_more,
+            }
+        })
+
+
+class ItemFacetsView(APIView):
+    """Item counts per type and per tag under the item list's filters."""
+
+    @conditional_get
+    def get(self, request: Request) -> Response:
+        tag_ids = request.query_params.getlist("tag")
+        tag_mode = request.query_params.get("tag_mode", filters.TAG_MODE_ANY)
+        if tag_mode not in filters.TAG_MODES:
+            return Response(
+                {"error": {"code": "INVALID_TAG_MODE", "message": f"tag_mode must be one of: {', '.join(filters.TAG_MODES)}"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        item_type = request.query_params.get("type")
+        search_query = request.query_params.get("q", "").strip()
+
+        if tag_ids or item_type or search_query:
+            items = filters.apply_filters(Item.objects.filter(user=request.user), tag_ids, tag_mode, item_type, search_query)
+            facet_counts = facets.count(items)
+        else:
+            facet_counts = facets.stored_counts(request.user.id)
+
+        return Response({"data": {"facets": facet_counts}})
+
+
+class ItemSuggestView(APIView):
+    """Top title, file name and tag completions for a search prefix."""
+
+    def get(self, request: Request) -> Response:
+        query = request.query_params.get("q", "").strip()
+
+        try:
+            limit = int(request.query_params.get("limit", 8))
+        except ValueError:
+            limit = 8
+        if limit < 1 or limit > 20:
+            limit = 8
+
+        return Response({
+            "data": {
+                "query": query,
+                "suggestions": suggestions.suggest(request.user.id, query, limit),
             }
         })
 
 
 class TagListView(APIView):
+    @conditional_get
     def get(self, request: Request) -> Response:
         tags = Tag.objects.filter(user=request.user)
-        tags_data = [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags]
+        tags_data = [{"id": t.id, "name": t.name, "color": t.color} for t in tags]
         return Response({"data": {"tags": tags_data}})
 
     def post(self, request: Request) -> Response:
@@ -369,10 +454,13 @@ class TagListView(APIView):
                 status=status.HTTP_409_CONFLICT,
             )
 
-        tag = Tag.objects.create(user=request.user, name=name, color=color)
+        with transaction.atomic():
+            tag = Tag.objects.create(user=request.user, name=name, color=color)
+            suggestions.record_tag_renamed(request.user.id, None, tag.name)
+            versions.bump(request.user.id)
 
         return Response(
-            {"data": {"tag": {"id": str(tag.id), "name": tag.name, "color": tag.color}}},
+            {"data": {"tag": {"id": tag.id, "name": tag.name, "color": tag.color}}},
             status=status.HTTP_201_CREATED,
         )
 
@@ -395,12 +483,17 @@ class TagDetailView(APIView):
         name = request.data.get("name", "").strip()
         color = request.data.get("color", "").strip()
 
+        old_name = tag.name
         if name:
             tag.name = name
         if color:
             tag.color = color
 
-        tag.save()
+        with transaction.atomic():
+            tag.save()
+            suggestions.record_tag_renamed(request.user.id, old_name, tag.name)
+            # Items embed their tags, so every tagged item has changed
+            sync.record_changed(request.user.id, Item.objects.filter(user=request.user, item_tags__tag=tag))
 
         return Response({"data": {"message": "Tag updated successfully"}})
 
@@ -412,7 +505,11 @@ class TagDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        tag.delete()
+        with transaction.atomic():
+            counters.forget_tag(request.user.id, tag.id)
+            suggestions.record_tag_renamed(request.user.id, tag.name, None)
+            sync.record_changed(request.user.id, Item.objects.filter(user=request.user, item_tags__tag=tag))
+            tag.delete()
 
         return Response({"data": {"message": "Tag deleted successfully"}})
 
@@ -427,8 +524,10 @@ class FileUploadView(APIView):
         user = request.user
 
         file: UploadedFile | None = request.FILES.get("file")
+        # Clients may send the hash alone first and skip uploading content they already stored
+        sha256 = str(request.data.get("sha256") or "").lower()
 
-        if not file:
+        if not file and not sha256:
             return Response(
                 {"error": {"code": "NO_FILE", "message": "No file provided"}},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -437,79 +536,234 @@ class FileUploadView(APIView):
         item_type = request.data.get("type")
         title = request.data.get("title", "").strip() or None
 
-        mimetype = file.content_type or "application/octet-stream"
-        filename = file.name
-        file_size = file.size
-
-        if item_type == ItemType.IMAGE:
-            if file_size > settings.MAX_IMAGE_SIZE:
+        if file:
+            mimetype = file.content_type or "application/octet-stream"
+            filename = file.name
+            file_size = file.size
+        else:
+            blob = blobs.owned_blob(user, sha256)
+            if not blob:
                 return Response(
-                    {"error": {"code": "FILE_TOO_LARGE", "message": f"Image exceeds {settings.MAX_IMAGE_SIZE} bytes"}},
-                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    {"error": {"code": "BLOB_NOT_FOUND", "message": "No stored file has this hash; upload the file"}},
+                    status=status.HTTP_404_NOT_FOUND,
                 )
-        elif item_type == ItemType.VIDEO:
-            if file_size > settings.MAX_VIDEO_SIZE:
+            filename = uploads.clean_file_name(request.data.get("file_name", ""))
+            if not filename:
                 return Response(
-                    {"error": {"code": "FILE_TOO_LARGE", "message": f"Video exceeds {settings.MAX_VIDEO_SIZE} bytes"}},
-                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    {"error": {"code": "INVALID_FILE_NAME", "message": "file_name is required"}},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-        else:
-            if file_size > settings.MAX_FILE_SIZE:
+            mimetype = request.data.get("file_mimetype") or "application/octet-stream"
+            file_size = blob.size
+
+        max_size = uploads.max_file_size(item_type)
+        if file_size > max_size:
+            label = {ItemType.IMAGE: "Image", ItemType.VIDEO: "Video"}.get(item_type, "File")
+            return Response(
+                {"error": {"code": "FILE_TOO_LARGE", "message": f"{label} exceeds {max_size} bytes"}},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        temp_path = None
+        if file:
+            temp_path, digest, file_size = blobs.write_temp(file.chunks())
+            if sha256 and sha256 != digest:
+                os.remove(os.path.join(settings.MEDIA_ROOT, temp_path))
                 return Response(
-                    {"error": {"code": "FILE_TOO_LARGE", "message": f"File exceeds {settings.MAX_FILE_SIZE} bytes"}},
-                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    {"error": {"code": "CHECKSUM_MISMATCH", "message": f"The uploaded file's SHA-256 is {digest}"}},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
+            sha256 = digest
 
-        user_dir = str(user.id)
-        upload_dir = os.path.join(settings.MEDIA_ROOT, user_dir)
-        os.makedirs(upload_dir, exist_ok=True)
-
-        unique_filename = f"{uuid.uuid4()}-{filename}"
-        file_path = os.path.join(user_dir, unique_filename)
-        full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-
-        with open(full_path, "wb+") as destination:
-            for chunk in file.chunks():
-                destination.write(chunk)
-
-        item = Item.objects.create(
-            user=user,
-            type=item_type,
-            title=title,
-            file_path=file_path,
-            file_name=filename,
-            file_size=file_size,
-            file_mimetype=mimetype,
-        )
-
-        tag_ids = request.data.getlist("tag_ids")
-        if tag_ids:
-            for tag_id in tag_ids:
-                try:
-                    tag = Tag.objects.get(id=tag_id, user=user)
-                    ItemTag.objects.create(item=item, tag=tag)
-                except Tag.DoesNotExist:
-                    pass
+        try:
+            item = uploads.create_file_item(
+                user, item_type, title, filename, mimetype, tagging.requested_tag_ids(request.data),
+                sha256, file_size, temp_path=temp_path,
+            )
+        except Exception:
+            if temp_path and os.path.exists(os.path.join(settings.MEDIA_ROOT, temp_path)):
+                os.remove(os.path.join(settings.MEDIA_ROOT, temp_path))
+            raise
+        if item is None:
+            return Response(
+                {"error": {"code": "BLOB_NOT_FOUND", "message": "No stored file has this hash; upload the file"}},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
         return Response(
             {
                 "data": {
                     "item": {
-                        "id": str(item.id),
+                        "id": item.id,
                         "type": item.type,
                         "title": item.title,
                         "file_name": item.file_name,
                         "file_size": item.file_size,
-                        "created_at": item.created_at.isoformat(),
-                    }
+                        "created_at": item.created_at,
+                    },
+                    "sha256": sha256,
                 }
             },
             status=status.HTTP_201_CREATED,
         )
 
 
+def _upload_session_data(session) -> dict:
+    data = {
+        "id": session.id,
+        "type": session.type,
+        "file_name": session.file_name,
+        "file_size": session.file_size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "status": session.status,
+        "expires_at": session.expires_at,
+    }
+    if session.status == UploadSession.Status.COMPLETE:
+        data["item_id"] = session.item_id
+        data["sha256"] = session.sha256
+    elif session.status == UploadSession.Status.FAILED:
+        data["error"] = session.error
+    return data
+
+
+class UploadSessionListView(APIView):
+    """Start a resumable upload (see apps.items.uploads)."""
+
+    def post(self, request: Request) -> Response:
+        item_type = request.data.get("type")
+        if item_type not in uploads.FILE_TYPES:
+            return Response(
+                {"error": {"code": "INVALID_TYPE", "message": f"Invalid item type. Must be one of: {', '.join(uploads.FILE_TYPES)}"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_name = uploads.clean_file_name(request.data.get("file_name", ""))
+        if not file_name:
+            return Response(
+                {"error": {"code": "INVALID_FILE_NAME", "message": "file_name is required"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_size = request.data.get("file_size")
+        if not isinstance(file_size, int) or isinstance(file_size, bool) or file_size < 1:
+            return Response(
+                {"error": {"code": "INVALID_FILE_SIZE", "message": "file_size must be a positive integer"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        max_size = uploads.max_session_size(item_type)
+        if file_size > max_size:
+            return Response(
+                {"error": {"code": "FILE_TOO_LARGE", "message": f"File exceeds {max_size} bytes"}},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        title = (request.data.get("title") or "").strip() or None
+        mimetype = request.data.get("file_mimetype") or "application/octet-stream"
+        tag_ids = tagging.requested_tag_ids(request.data) or []
+
+        try:
+            session = uploads.create_session(request.user, item_type, file_name, file_size, mimetype, title, tag_ids)
+        except uploads.UploadQuotaExceeded as e:
+            return Response(
+                {"error": {"code": "UPLOAD_QUOTA_EXCEEDED", "message": str(e)}},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+        except OSError:
+            return Response(
+                {"error": {"code": "INSUFFICIENT_STORAGE", "message": "Not enough storage for this file"}},
+                status=status.HTTP_507_INSUFFICIENT_STORAGE,
+            )
+
+        return Response({"data": {"upload": _upload_session_data(session)}}, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionDetailView(APIView):
+    def get_object(self, pk: uuid.UUID, user):
+        return UploadSession.objects.filter(pk=pk, user=user).first()
+
+    def not_found(self) -> Response:
+        return Response(
+            {"error": {"code": "NOT_FOUND", "message": "Upload not found"}},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    def get(self, request: Request, pk: uuid.UUID) -> Response:
+        session = self.get_object(pk, request.user)
+        if not session:
+            return self.not_found()
+
+        data = _upload_session_data(session)
+        if session.status == UploadSession.Status.RECEIVING:
+            data["missing_chunks"] = uploads.missing_chunks(session)
+        return Response({"data": {"upload": data}})
+
+    def put(self, request: Request, pk: uuid.UUID) -> Response:
+        """Write one chunk; the body is the raw bytes and ?offset= its position."""
+        session = self.get_object(pk, request.user)
+        if not session:
+            return self.not_found()
+
+        try:
+            offset = int(request.query_params.get("offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return Response(
+                {"error": {"code": "INVALID_CHUNK", "message": "offset must be an integer"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            uploads.write_chunk(session, offset, length, request.stream)
+        except uploads.InvalidChunk as e:
+            return Response(
+                {"error": {"code": "INVALID_CHUNK", "message": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except (FileNotFoundError, uploads.UploadNotFound):
+            # Completed, aborted or expired before or while this chunk was in flight
+            return self.not_found()
+
+        return Response({"data": {"upload": {"id": session.id, "offset": offset, "length": length}}})
+
+    def delete(self, request: Request, pk: uuid.UUID) -> Response:
+        try:
+            if not uploads.abort(pk, request.user):
+                return self.not_found()
+        except uploads.UploadFinishing as e:
+            return Response(
+                {"error": {"code": "UPLOAD_FINISHING", "message": str(e)}},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response({"data": {"message": "Upload cancelled"}})
+
+
+class UploadSessionCompleteView(APIView):
+    """Ask for a fully received upload to become an item.
+
+    Answers 202 at once; poll the upload until its status is ``complete``
+    (with ``item_id``) or ``failed`` (with ``error``).
+    """
+
+    def post(self, request: Request, pk: uuid.UUID) -> Response:
+        try:
+            session = uploads.complete(pk, request.user, request.data.get("sha256"))
+        except uploads.IncompleteUpload as e:
+            return Response(
+                {"error": {"code": "UPLOAD_INCOMPLETE", "message": str(e)}},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if session is None:
+            return Response(
+                {"error": {"code": "NOT_FOUND", "message": "Upload not found"}},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        return Response({"data": {"upload": _upload_session_data(session)}}, status=status.HTTP_202_ACCEPTED)
+
+
 class FileServeView(APIView):
-    def get(self, request: Request, pk: uuid.UUID) -> FileResponse | HttpResponse:
+    def get(self, request: Request, pk: uuid.UUID) -> StreamingHttpResponse | HttpResponse:
         try:
             item = Item.objects.get(pk=pk, user=request.user)
         except Item.DoesNotExist:
@@ -526,39 +780,90 @@ class FileServeView(APIView):
                 content_type="application/json",
             )
 
-        full_path = os.path.join(settings.MEDIA_ROOT, item.file_path)
-
-        if not os.path.exists(full_path):
+        # Files never change after upload: the hash (or id and size) names the content
+        etag = f'"{item.file_sha256}"' if item.file_sha256 else f'"{item.id.hex}-{item.file_size}"'
+        try:
+            response = serving.serve(
+                request, item.file_path, item.file_mimetype, etag, int(item.created_at.timestamp())
+            )
+        except FileNotFoundError:
             return HttpResponse(
                 json.dumps({"error": {"code": "FILE_NOT_FOUND", "message": "File not found on disk"}}),
                 status=404,
                 content_type="application/json",
             )
 
+        response["Content-Disposition"] = f'inline; filename="{item.file_name}"'
+        return response
+
+
+class FileThumbnailView(APIView):
+    """A scaled-down copy of an image item, or a video item's poster frame.
+
+    Images are scaled to ``?w=`` pixels wide, or the nearest width offered.
+    """
+
+    def get(self, request: Request, pk: uuid.UUID) -> StreamingHttpResponse | HttpResponse:
+        try:
+            item = Item.objects.get(pk=pk, user=request.user)
+        except Item.DoesNotExist:
+            return HttpResponse(
+                json.dumps({"error": {"code": "NOT_FOUND", "message": "Item not found"}}),
+                status=404,
+                content_type="application/json",
+            )
+
+        no_thumbnail = HttpResponse(
+            json.dumps({"error": {"code": "NO_THUMBNAIL", "message": "This item has no thumbnail"}}),
+            status=404,
+            content_type="application/json",
+        )
+        if item.type not in (ItemType.IMAGE, ItemType.VIDEO) or not item.file_path:
+            return no_thumbnail
+        last_modified = int(item.created_at.timestamp())
+
         if item.type == ItemType.VIDEO:
-            range_header = request.META.get("HTTP_RANGE", "")
-
-            if range_header:
-                file_size = os.path.getsize(full_path)
-                ranges = range_header.replace("bytes=", "").split("-")
-                start = int(ranges[0]) if ranges[0] else 0
-                end = int(ranges[1]) if len(ranges) > 1 and ranges[1] else file_size - 1
-
-                response = FileResponse(
-                    open(full_path, "rb"),
-                    content_type=item.file_mimetype,
-                    status=206,
+            source = previews.source_key(item)
+            etag = f'"{source}-{videos.POSTER_NAME}"'
+            if not serving.not_modified(request, etag, last_modified) and videos.poster(item) is None:
+                # Not extracted yet, or evicted and queued again
+                no_thumbnail["Cache-Control"] = f"private, max-age={videos.POSTER_PENDING_MAX_AGE}"
+                return no_thumbnail
+            try:
+                return serving.serve(
+                    request, Derivative.path_for(source, videos.POSTER_NAME), videos.POSTER_MIMETYPE,
+                    etag, last_modified,
                 )
-                response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-                response["Content-Length"] = str(end - start + 1)
-                response["Accept-Ranges"] = "bytes"
-            else:
-                response = FileResponse(open(full_path, "rb"), content_type=item.file_mimetype)
-        else:
-            response = FileResponse(open(full_path, "rb"), content_type=item.file_mimetype)
+            except FileNotFoundError:
+                return no_thumbnail
 
-        response["Content-Disposition"] = f'inline; filename="{item.file_name}"'
-        return response
+        requested = request.query_params.get("w")
+        try:
+            width = previews.thumbnail_width(int(requested) if requested else None)
+        except ValueError:
+            return HttpResponse(
+                json.dumps({"error": {"code": "INVALID_WIDTH", "message": "w must be a number of pixels"}}),
+                status=400,
+                content_type="application/json",
+            )
+
+        # Without Pillow, or for images it cannot read, the original stands in
+        original = HttpResponseRedirect(f"/api/files/{item.id}/serve/")
+        if not previews.HAS_PILLOW:
+            return original
+
+        source, name = previews.source_key(item), previews.thumbnail_name(width)
+        etag = f'"{source}-{name}"'
+        if not serving.not_modified(request, etag, last_modified) and previews.thumbnail(item, width) is None:
+            return original
+
+        try:
+            return serving.serve(
+                request, Derivative.path_for(source, name), previews.thumbnail_mimetype(), etag, last_modified
+            )
+        except FileNotFoundError:
+            # Evicted between generating and serving
+            return original
 
 
 class ItemPinToggleView(APIView):
@@ -572,13 +877,69 @@ class ItemPinToggleView(APIView):
             )
 
         item.is_pinned = not item.is_pinned
-        item.save()
+        with transaction.atomic():
+            item.save()
+            sync.record_changed(request.user.id, Item.objects.filter(pk=item.pk))
 
         return Response(
-            {"data": {"item": {"id": str(item.id), "is_pinned": item.is_pinned}}}
+            {"data": {"item": {"id": item.id, "is_pinned": item.is_pinned}}}
         )
 
 
+class ItemBatchView(APIView):
+    """Tag, untag, pin or retype many items with one request."""
+
+    def post(self, request: Request) -> Response:
+        item_ids = request.data.get("item_ids", [])
+        if not isinstance(item_ids, list) or not item_ids:
+            return Response(
+                {"error": {"code": "NO_ITEMS", "message": "No items provided"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(item_ids) > settings.MAX_BULK_ITEMS:
+            return Response(
+                {"error": {"code": "TOO_MANY_ITEMS", "message": f"At most {settings.MAX_BULK_ITEMS} items can be changed per request"}},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        operations = {name: request.data[name] for name in batch.OPERATIONS if name in request.data}
+        if not operations:
+            return Response(
+                {"error": {"code": "NO_OPERATIONS", "message": f"Provide at least one of: {', '.join(batch.OPERATIONS)}"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        for name in ("add_tags", "remove_tags"):
+            if name in operations:
+                if not isinstance(operations[name], list):
+                    return Response(
+                        {"error": {"code": "INVALID_TAGS", "message": f"{name} must be a list of tag ids"}},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                operations[name] = tagging.owned_tag_ids(request.user, operations[name])
+        if "set_pinned" in operations and not isinstance(operations["set_pinned"], bool):
+            return Response(
+                {"error": {"code": "INVALID_PINNED", "message": "set_pinned must be true or false"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if "set_type" in operations and operations["set_type"] not in batch.FILE_TYPES:
+            return Response(
+                {"error": {"code": "INVALID_TYPE", "message": f"set_type must be one of: {', '.join(batch.FILE_TYPES)}"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        items = batch.owned_items(request.user, item_ids)
+        if "set_type" in operations:
+            incompatible = batch.incompatible_with_type(items)
+            if incompatible:
+                return Response(
+                    {"error": {"code": "INCOMPATIBLE_TYPE", "message": f"{len(incompatible)} item(s) are not files and cannot change type; nothing was changed", "item_ids": incompatible}},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        changed, affected = batch.apply(request.user, items, operations)
+
+        return Response({"data": {"changed": changed, "affected": affected}})
+
+
 class ItemBatchDeleteView(APIView):
     def post(self, request: Request) -> Response:
         item_ids = request.data.get("item_ids", [])
@@ -590,22 +951,26 @@ class ItemBatchDeleteView(APIView):
             )
 
         # Filter to only items owned by the user
-        items = Item.objects.filter(id__in=item_ids, user=request.user)
-
-        # Delete files from filesystem
-        for item in items:
-            if item.file_path:
-                full_path = os.path.join(settings.MEDIA_ROOT, item.file_path)
-                if os.path.exists(full_path):
-                    os.remove(full_path)
-
-        # Delete items (cascade will handle ItemTag deletion)
-        count = items.count()
-        items.delete()
+        items = batch.owned_items(request.user, item_ids)
+
+        # Delete items (cascade will handle ItemTag deletion). Their files
+        # are unlinked later by manage.py reclaim_files.
+        with transaction.atomic():
+            counters.record_removed(request.user.id, items)
+            suggestions.record_items_removed(request.user.id, items)
+            sync.record_deleted(request.user.id, items)
+            queued_files, queued_bytes = reclaim.enqueue(items)
+            _, deleted = items.delete()
+            count = deleted.get(Item._meta.label, 0)
 
-        return Response(
-            {"data": {"message": f"Successfully deleted {count} item(s)", "count": count}}
-        )
+        return Response({
+            "data": {
+                "message": f"Successfully deleted {count} item(s)",
+                "count": count,
+                "queued_files": queued_files,
+                "queued_bytes": queued_bytes,
+            }
+        })
 
 
 class CreateShareView(APIView):
@@ -681,6 +1046,8 @@ class CreateShareView(APIView):
             share.set_password(password)
             share.save()
 
+        versions.bump(request.user.id)
+
         # Generate share URL using frontend URL
         share_identifier = share.slug or str(share.token)
         share_url = f"{settings.FRONTEND_URL.rstrip('/')}/shared/{share_identifier}/"
@@ -689,11 +1056,11 @@ class CreateShareView(APIView):
             {
                 "data": {
                     "share": {
-                        "id": str(share.id),
-                        "token": str(share.token),
+                        "id": share.id,
+                        "token": share.token,
                         "slug": share.slug,
                         "share_url": share_url,
-                        "expires_at": share.expires_at.isoformat(),
+                        "expires_at": share.expires_at,
                         "max_access_count": share.max_access_count,
                         "access_count": share.access_count,
                         "has_password": share.has_password,
@@ -746,30 +1113,7 @@ class ViewSharedItemView(APIView):
         share.save()
 
         # Get item data
-        item = share.item
-        tags = [it.tag for it in item.item_tags.all()]
-
-        data = {
-            "id": str(item.id),
-            "type": item.type,
-            "title": item.title,
-            "created_at": item.created_at.isoformat(),
-            "tags": [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags],
-        }
-
-        if item.content:
-            if item.type == ItemType.LOGIN:
-                data["content"] = json.loads(item.content)
-            else:
-                data["content"] = item.content
-
-        if item.file_path:
-            data["file"] = {
-                "name": item.file_name,
-                "size": item.file_size,
-                "mimetype": item.file_mimetype,
-                "url": f"/api/files/{item.id}/serve/",
-            }
+        data = serialization.serialize_one(Item.objects.filter(pk=share.item_id), serialization.SHARED_FIELDS)
 
         return Response({"data": {"item": data}})
 
@@ -804,30 +1148,7 @@ class ViewSharedItemView(APIView):
         share.save()
 
         # Get item data
-        item = share.item
-        tags = [it.tag for it in item.item_tags.all()]
-
-        data = {
-            "id": str(item.id),
-            "type": item.type,
-            "title": item.title,
-            "created_at": item.created_at.isoformat(),
-            "tags": [{"id": str(t.id), "name": t.name, "color": t.color} for t in tags],
-        }
-
-        if item.content:
-            if item.type == ItemType.LOGIN:
-                data["content"] = json.loads(item.content)
-            else:
-                data["content"] = item.content
-
-        if item.file_path:
-            data["file"] = {
-                "name": item.file_name,
-                "size": item.file_size,
-                "mimetype": item.file_mimetype,
-                "url": f"/api/files/{item.id}/serve/",
-            }
+        data = serialization.serialize_one(Item.objects.filter(pk=share.item_id), serialization.SHARED_FIELDS)
 
         return Response({"data": {"item": data}})
 
@@ -849,16 +1170,16 @@ class ListSharesView(APIView):
             share_identifier = share.slug or str(share.token)
             share_url = f"{settings.FRONTEND_URL.rstrip('/')}/shared/{share_identifier}/"
             shares_data.append({
-                "id": str(share.id),
-                "token": str(share.token),
+                "id": share.id,
+                "token": share.token,
                 "slug": share.slug,
                 "share_url": share_url,
-                "expires_at": share.expires_at.isoformat() if share.expires_at else None,
+                "expires_at": share.expires_at,
                 "max_access_count": share.max_access_count,
                 "access_count": share.access_count,
                 "is_valid": share.is_valid(),
                 "has_password": share.has_password,
-                "created_at": share.created_at.isoformat(),
+                "created_at": share.created_at,
             })
 
         return Response({"data": {"shares": shares_data}})
@@ -874,6 +1195,8 @@ class DeleteShareView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        share.delete()
+        with transaction.atomic():
+            share.delete()
+            versions.bump(request.user.id)
 
         return Response({"data": {"message": "Share deleted successfully"}})
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -20,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "corsheaders",
     "apps.users",
@@ -66,6 +68,18 @@ DATABASES = {
     )
 }
 
+# Cache used for rendered list pages. Keys embed the user's data version, so
+# a per-process LocMemCache is safe; point CACHE_BACKEND at a shared backend
+# (e.g. django.core.cache.backends.filebased.FileBasedCache) to share hits
+# between workers.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "keepr"),
+    }
+}
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))  # seconds
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -96,7 +110,9 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "apps.core.renderers.ORJSONRenderer",
+        # Offered for Accept: application/msgpack when the optional msgpack package is installed
+        *(["apps.core.renderers.MessagePackRenderer"] if find_spec("msgpack") else []),
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
@@ -124,6 +140,49 @@ MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", 10485760))  # 10MB
 MAX_VIDEO_SIZE = int(os.getenv("MAX_VIDEO_SIZE", 104857600))  # 100MB
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 20971520))  # 20MB
 
+# Items per bulk creation or batch operation request, and the largest
+# request body Django will read (it also applies to every other endpoint)
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", 5000))
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("DATA_UPLOAD_MAX_MEMORY_SIZE", 10485760))  # 10MB
+
+# Search-as-you-type suggestion cache, kept per worker process
+SUGGEST_CACHE_USERS = int(os.getenv("SUGGEST_CACHE_USERS", 256))
+SUGGEST_CACHE_TTL = int(os.getenv("SUGGEST_CACHE_TTL", 60))  # seconds
+
+# Delta sync: deleted items are reported to clients for this long
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", 30))
+
+# Resumable uploads: chunk size, and how long an unfinished upload is kept
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 8388608))  # 8MB
+UPLOAD_SESSION_HOURS = int(os.getenv("UPLOAD_SESSION_HOURS", 24))
+# Largest video or file a resumable upload accepts (images keep
+# MAX_IMAGE_SIZE), and the space one user's unfinished uploads may reserve
+MAX_CHUNKED_UPLOAD_SIZE = int(os.getenv("MAX_CHUNKED_UPLOAD_SIZE", 10737418240))  # 10GB
+UPLOAD_RESERVED_BYTES_PER_USER = int(os.getenv("UPLOAD_RESERVED_BYTES_PER_USER", 21474836480))  # 20GB
+
+# How /api/files/<id>/serve/ sends file bodies once access is checked:
+# "django" streams them from the worker; "x-accel-redirect" (nginx) and
+# "x-sendfile" (Apache, lighttpd) hand them to the front-end server
+FILE_SERVE_MODE = os.getenv("FILE_SERVE_MODE", "django")
+# nginx internal location that maps to MEDIA_ROOT (see client/nginx.conf)
+FILE_SERVE_ACCEL_PREFIX = os.getenv("FILE_SERVE_ACCEL_PREFIX", "/protected-media/")
+
+# Image thumbnails (needs Pillow): widths offered by /api/files/<id>/thumb/?w=,
+# and the disk budget for generated files before the least recently used go
+THUMBNAIL_WIDTHS = [int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "256,512,1024").split(",")]
+THUMBNAIL_CACHE_BYTES = int(os.getenv("THUMBNAIL_CACHE_BYTES", 1073741824))  # 1GB
+
+# Video posters and metadata come from these binaries, run by
+# manage.py generate_previews; failures are retried with backoff up to
+# PREVIEW_MAX_ATTEMPTS times
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+FFPROBE_PATH = os.getenv("FFPROBE_PATH", "ffprobe")
+PREVIEW_MAX_ATTEMPTS = int(os.getenv("PREVIEW_MAX_ATTEMPTS", 5))
+
+# Deleted items' files are unlinked by manage.py reclaim_files; failures are
+# retried with backoff up to this many times
+FILE_RECLAIM_MAX_ATTEMPTS = int(os.getenv("FILE_RECLAIM_MAX_ATTEMPTS", 10))
+
 # Local backup directory
 LOCAL_BACKUP_DIR = os.getenv("LOCAL_BACKUP_DIR")
 
@@ -5,6 +5,12 @@ set -e
 echo "Running Django migrations..."
 python manage.py migrate --noinput
 
+# Index any items that predate the full-text search trigger
+python manage.py rebuild_search_vectors
+
+# Drop delta-sync tombstones past their retention period
+python manage.py compact_tombstones
+
 # Create superuser if ADMIN_USERNAME and ADMIN_PASSWORD are set
 if [ -n "$ADMIN_USERNAME" ] && [ -n "$ADMIN_PASSWORD" ]; then
     echo "Creating superuser: $ADMIN_USERNAME"
@@ -35,6 +41,28 @@ if [ -n "$LOCAL_BACKUP_DIR" ]; then
     mkdir -p "$LOCAL_BACKUP_DIR"
 fi
 
+# Unlink files of deleted items in the background. Set RECLAIM_WORKER=false
+# when running "manage.py reclaim_files --loop" as a separate service.
+if [ "${RECLAIM_WORKER:-true}" = "true" ]; then
+    echo "Starting file reclamation worker..."
+    python manage.py reclaim_files --loop &
+fi
+
+# Turn completed resumable uploads into items. Set UPLOAD_WORKER=false when
+# running "manage.py finish_uploads --loop" as a separate service.
+if [ "${UPLOAD_WORKER:-true}" = "true" ]; then
+    echo "Starting upload worker..."
+    python manage.py finish_uploads --loop &
+fi
+
+# Extract video posters and metadata in the background. Set
+# PREVIEW_WORKER=false when running "manage.py generate_previews --loop" as
+# a separate service.
+if [ "${PREVIEW_WORKER:-true}" = "true" ]; then
+    echo "Starting preview worker..."
+    python manage.py generate_previews --loop &
+fi
+
 # Start the application
 echo "Starting Keepr backend..."
 exec "$@"